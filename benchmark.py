@@ -0,0 +1,290 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import timeit
+from datetime import datetime
+from pathlib import Path
+from src.dataset import load_test_cases
+from src.gold_cache import get_gold_cache
+from src.inference_client import close_async_clients, set_base_url, set_transport
+from src.mock_model import FaultProfile, MockModel, MockServer, MockTransport
+from src.parallel_eval import evaluate_cases
+from src.prompts import basic_prompt, few_shot_prompt, agentic_prompt
+from src.sql_ast import parse_sql
+from src.sql_evaluator import calculate_answer_match_percent, calculate_sql_match_percent, normalize_sql
+from src.sql_generator import extract_sql, generate_sql_requests_async, load_model_config
+from src.sql_response import get_answer
+
+PROMPTS = [("prompt_1", basic_prompt), ("prompt_2", few_shot_prompt), ("prompt_3_agentic", agentic_prompt)]
+
+# Synthetic result sizes for answer matching (the largest is skipped with --quick)
+ROW_COUNTS = [1, 1_000, 100_000, 1_000_000]
+
+DEFAULT_THRESHOLD = 0.2
+
+
+def measure(func, repeat: int = 5) -> dict:
+    """
+    Time `func` with timeit: the loop count is calibrated to run for at least 0.2s,
+    then repeated `repeat` times.
+
+    Returns:
+        Dictionary with per-call median_s, min_s, mean_s and the loop count
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    times = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "mean_s": statistics.mean(times),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def _reasoning_response(size: int, fenced: bool = False) -> str:
+    """A long reasoning-style response of about `size` characters ending in a SQL block."""
+    rng = random.Random(size)
+    words = ["table", "join", "column", "filter", "the", "customer", "invoice", "we", "need", "group", "by", "total"]
+    text = []
+    length = 0
+    while length < size:
+        sentence = " ".join(rng.choice(words) for _ in range(12)) + ".\n"
+        text.append(sentence)
+        length += len(sentence)
+    sql = "SELECT c.Country, COUNT(*) AS n FROM Customer c GROUP BY c.Country ORDER BY n DESC"
+    block = f"```sql\n{sql}\n```" if fenced else f"<sql_query>\n{sql}\n</sql_query>"
+    return "".join(text) + block
+
+
+def _synthetic_rows(count: int, seed: int = 0) -> list:
+    rows = [{"id": i, "name": f"name{i}", "value": i * 0.5} for i in range(count)]
+    random.Random(seed).shuffle(rows)
+    return rows
+
+
+def _wanted(name: str, name_filter: str = None) -> bool:
+    return not name_filter or name_filter in name
+
+
+def micro_benchmarks(test_cases: list, quick: bool, name_filter: str = None):
+    """
+    Yield (name, callable) pairs for the micro-benchmarks whose name contains `name_filter`.
+
+    Fixtures are built lazily, just before their benchmark is yielded, and only
+    for the benchmarks selected.
+    """
+    for size in (10_000, 100_000):
+        name = f"extract_sql/tagged_{size // 1000}kb"
+        if _wanted(name, name_filter):
+            response = _reasoning_response(size)
+            yield name, lambda response=response: extract_sql(response)
+    if _wanted("extract_sql/fenced_100kb", name_filter):
+        fenced = _reasoning_response(100_000, fenced=True)
+        yield "extract_sql/fenced_100kb", lambda: extract_sql(fenced)
+
+    sqls = [case["sql"] for case in test_cases]
+    if _wanted("normalize_sql/eval_set", name_filter):
+        yield "normalize_sql/eval_set", lambda: [normalize_sql(sql) for sql in sqls]
+    if _wanted("parse_sql/eval_set", name_filter):
+        yield "parse_sql/eval_set", lambda: [parse_sql(sql) for sql in sqls]
+    if _wanted("calculate_sql_match_percent/eval_set", name_filter):
+        # Generated SQL differs from the gold query in case and spacing; gold parses are memoised
+        generated = [sql.lower().replace(", ", ",") for sql in sqls]
+        yield "calculate_sql_match_percent/eval_set", \
+            lambda: [calculate_sql_match_percent(gen, gold) for gen, gold in zip(generated, sqls)]
+
+    for count in ROW_COUNTS:
+        name = f"calculate_answer_match_percent/rows_{count}"
+        if (quick and count > 100_000) or not _wanted(name, name_filter):
+            continue
+        expected = _synthetic_rows(count, seed=1)
+        actual = _synthetic_rows(count, seed=2)
+        yield name, lambda actual=actual, expected=expected: calculate_answer_match_percent(actual, expected)
+
+    for i, case in enumerate(test_cases, 1):
+        name = f"get_answer/case_{i:02d}"
+        if _wanted(name, name_filter):
+            yield name, lambda sql=case["sql"]: get_answer(sql)
+
+
+def run_pipeline(test_cases: list, model_key: str) -> int:
+    """Generate (mocked model), execute and score every (case, prompt) pair once; return the pair count."""
+    requests = [(case["question"], prompt_func) for case in test_cases for _, prompt_func in PROMPTS]
+
+    async def generate():
+        try:
+            # One candidate per request, whatever self_consistency.samples says
+            return await generate_sql_requests_async(requests, model_key, samples=1)
+        finally:
+            await close_async_clients()
+
+    sqls = asyncio.run(generate())
+    expected_results = get_gold_cache().get_many([case["sql"] for case in test_cases])
+    cases = [
+        (case["sql"], expected, sqls[i * len(PROMPTS):(i + 1) * len(PROMPTS)])
+        for i, (case, expected) in enumerate(zip(test_cases, expected_results))
+    ]
+    evaluate_cases(cases)
+    return len(requests)
+
+
+def pipeline_benchmark(test_cases: list, latency: float, http: bool = False, name_filter: str = None):
+    """
+    Yield the end-to-end benchmark: async generation against a mocked model,
+    gold results, execution and scoring, all in this process.
+
+    The mocked model is reached through an in-process httpx transport, or with
+    `http` over real HTTP connections to a local `MockServer` thread. The
+    response cache and rate limits are disabled for this process so every
+    iteration goes through the API client. Nothing is set up unless the
+    benchmark name contains `name_filter`.
+    """
+    name = "pipeline/mock_server" if http else "pipeline/mock_model"
+    if not _wanted(name, name_filter):
+        return
+    config = load_model_config()
+    config["response_cache"] = dict(config.get("response_cache", {}), enabled=False)
+    config["rate_limits"] = {"default": {"requests_per_minute": 10**9, "tokens_per_minute": 10**12}}
+    os.environ.setdefault("FIREWORKS_API_KEY", "mock")
+    model = MockModel(test_cases)
+    model_key = next(iter(config["model"]))
+    if http:
+        server = MockServer(model, FaultProfile(latency=latency), port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        set_base_url(server.base_url)
+    else:
+        set_transport(MockTransport(model, latency=latency))
+    yield name, lambda: run_pipeline(test_cases, model_key)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    test_cases = load_test_cases(["evaluation_data.json", "custom_test_cases.jsonl"])
+    # Consumed lazily: fixtures are built as their benchmark is reached, not all up front
+    benchmarks = micro_benchmarks(test_cases, args.quick, args.filter)
+    if not args.skip_pipeline:
+        benchmarks = itertools.chain(
+            benchmarks, pipeline_benchmark(test_cases, args.mock_latency, args.mock_server, args.filter)
+        )
+
+    results = {}
+    for name, func in benchmarks:
+        results[name] = measure(func, repeat=args.repeat)
+        print(f"{name:<48} {results[name]['median_s'] * 1e6:>14.1f} us  (x{results[name]['number']})")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+            "mock_latency": args.mock_latency,
+            "mock_server": args.mock_server,
+        },
+        "benchmarks": results,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults saved to: {output}")
+
+
+def compare_reports(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    Compare median timings of two benchmark reports.
+
+    Args:
+        baseline: Report saved by `run`
+        current: Report saved by `run`
+        threshold: Relative slowdown (e.g. 0.2 = 20%) flagged as a regression
+
+    Returns:
+        List of dicts with name, baseline_s, current_s, ratio and status
+        ("regression", "improvement", "ok", "new" or "missing")
+    """
+    base, cur = baseline["benchmarks"], current["benchmarks"]
+    rows = []
+    for name in list(base) + [name for name in cur if name not in base]:
+        if name not in cur:
+            rows.append({"name": name, "baseline_s": base[name]["median_s"], "current_s": None,
+                         "ratio": None, "status": "missing"})
+            continue
+        if name not in base:
+            rows.append({"name": name, "baseline_s": None, "current_s": cur[name]["median_s"],
+                         "ratio": None, "status": "new"})
+            continue
+        ratio = cur[name]["median_s"] / base[name]["median_s"]
+        status = "regression" if ratio > 1 + threshold else "improvement" if ratio < 1 - threshold else "ok"
+        rows.append({"name": name, "baseline_s": base[name]["median_s"], "current_s": cur[name]["median_s"],
+                     "ratio": ratio, "status": status})
+    return rows
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare_reports(baseline, current, args.threshold)
+    print(f"{'benchmark':<48} {'baseline us':>12} {'current us':>12} {'ratio':>7}  status")
+    for row in rows:
+        base = f"{row['baseline_s'] * 1e6:.1f}" if row["baseline_s"] is not None else "-"
+        cur = f"{row['current_s'] * 1e6:.1f}" if row["current_s"] is not None else "-"
+        ratio = f"{row['ratio']:.2f}x" if row["ratio"] is not None else "-"
+        print(f"{row['name']:<48} {base:>12} {cur:>12} {ratio:>7}  {row['status']}")
+
+    regressions = [row["name"] for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\nNo regressions over {args.threshold:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the text-to-SQL evaluation pipeline")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks and save the results as JSON")
+    run_parser.add_argument("--output", default="model_output/benchmark_results.json")
+    run_parser.add_argument("--filter", help="Only run benchmarks whose name contains this string")
+    run_parser.add_argument("--repeat", type=int, default=5, help="Timing repeats per benchmark")
+    run_parser.add_argument("--quick", action="store_true", help="Skip the 1M-row answer matching benchmark")
+    run_parser.add_argument("--skip-pipeline", action="store_true", help="Skip the end-to-end benchmark")
+    run_parser.add_argument("--mock-latency", type=float, default=0.0,
+                            help="Seconds the mocked model waits before each response")
+    run_parser.add_argument("--mock-server", action="store_true",
+                            help="Reach the mocked model over HTTP through a local mock server instead of in-process")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser("compare", help="Flag regressions against a saved baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="Relative slowdown of the median flagged as a regression")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import re
+from src.dataset import load_test_cases
+from src.prompts import count_tokens
+from src.schema_cache import get_schema_text
+from src.schema_retrieval import get_schema_index, relevant_schema_text
+
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def gold_tables(sql, tables):
+    """Tables referenced by a gold SQL query (identifiers matching a table name)."""
+    by_lower = {table.lower(): table for table in tables}
+    return {by_lower[word.lower()] for word in _IDENTIFIER_RE.findall(sql) if word.lower() in by_lower}
+
+
+def run_benchmark(test_cases, db_path, top_ks):
+    """
+    Measure gold-table recall and prompt tokens saved for each top_k.
+
+    Args:
+        test_cases: List of dicts with 'question' and 'sql'
+        db_path: Path to the SQLite database
+        top_ks: Values of top_k to evaluate
+
+    Returns:
+        List of dicts with top_k, recall, full_recall, avg_tokens, full_tokens and tokens_saved
+    """
+    index = get_schema_index(db_path)
+    full_tokens = count_tokens(get_schema_text(db_path))
+    rows = []
+    for top_k in top_ks:
+        hits = needed = complete = 0
+        tokens = []
+        for case in test_cases:
+            gold = gold_tables(case["sql"], index.tables)
+            selected = set(index.select_tables(case["question"], top_k))
+            hits += len(gold & selected)
+            needed += len(gold)
+            complete += gold <= selected
+            tokens.append(count_tokens(relevant_schema_text([case["question"]], db_path, top_k)))
+        avg_tokens = sum(tokens) / len(tokens)
+        rows.append({
+            "top_k": top_k,
+            "recall": hits / needed if needed else 1.0,
+            "full_recall": complete / len(test_cases),
+            "avg_tokens": avg_tokens,
+            "full_tokens": full_tokens,
+            "tokens_saved": 1 - avg_tokens / full_tokens,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark schema retrieval: gold-table recall vs. prompt tokens")
+    parser.add_argument("--db-path", default="Chinook.db")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 2, 3, 5, 8])
+    args = parser.parse_args()
+
+    test_cases = load_test_cases(["evaluation_data.json", "custom_test_cases.jsonl"])
+
+    print(f"{len(test_cases)} test cases, {len(get_schema_index(args.db_path).tables)} tables\n")
+    print(f"{'top_k':>5}  {'table recall':>12}  {'all tables':>10}  {'schema tokens':>13}  {'saved':>6}")
+    for row in run_benchmark(test_cases, args.db_path, args.top_k):
+        print(f"{row['top_k']:>5}  {row['recall']:>12.1%}  {row['full_recall']:>10.1%}  "
+              f"{row['avg_tokens']:>6.0f}/{row['full_tokens']:<6}  {row['tokens_saved']:>6.1%}")
+
+
+if __name__ == "__main__":
+    main()
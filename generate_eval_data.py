@@ -1,26 +1,33 @@
+import argparse
 import json
-from utils import load_db, query_db
-from src.custom_test_cases import CUSTOM_TEST_CASES
+from src.dataset import load_test_cases, write_jsonl
+from src.gold_cache import GoldQueryError, get_gold_cache
 
 
-def test_query(conn, sql, description):
-    """Test a SQL query and return the results if valid."""
-    try:
-        result = query_db(conn, sql, return_as_df=True)
-        print(f"✓ {description}")
+def test_queries(test_cases, db_path):
+    """Run every gold query (in parallel, through the gold-result cache) and report which are valid."""
+    results = get_gold_cache().get_many([case["sql"] for case in test_cases], db_path, return_exceptions=True)
+
+    valid_cases = []
+    for i, (test_case, result) in enumerate(zip(test_cases, results), 1):
+        print(f"\n{i}. {test_case['question']}")
+        if isinstance(result, GoldQueryError):
+            print(f"✗ Query {i}")
+            print(f"  Error: {result.__cause__}")
+            continue
+        print(f"✓ Query {i}")
         print(f"  Returned {len(result)} rows")
-        result_list = result.to_dict("records")
-        return True, result_list
-    except Exception as e:
-        print(f"✗ {description}")
-        print(f"  Error: {e}")
-        return False, None
+        valid_cases.append({key: test_case[key] for key in ("question", "sql", "category") if key in test_case})
+    return valid_cases
 
 
 def main():
-    # Load database
-    conn = load_db()
-    print("Database loaded successfully!\n")
+    parser = argparse.ArgumentParser(description="Validate gold SQL queries and write the evaluation dataset")
+    parser.add_argument("--db-path", default="Chinook.db")
+    parser.add_argument("--custom", default="custom_test_cases.jsonl", help="Custom test cases to validate as well")
+    parser.add_argument("--output", default="evaluation_data.json",
+                        help="Output file (JSON array, or one case per line if it ends in .jsonl)")
+    args = parser.parse_args()
 
     test_cases = [
         {
@@ -76,35 +83,24 @@ def main():
     ]
     
     # Add custom test cases
-    test_cases.extend(CUSTOM_TEST_CASES)
+    test_cases.extend(load_test_cases(args.custom))
 
     print("Testing SQL queries...\n")
     print("=" * 80)
 
-    valid_cases = []
-    for i, test_case in enumerate(test_cases, 1):
-        print(f"\n{i}. {test_case['question']}")
-        success, results = test_query(conn, test_case["sql"], f"Query {i}")
-        if success:
-            valid_cases.append(
-                {
-                    "question": test_case["question"],
-                    "sql": test_case["sql"],
-                    "expected_result": results,
-                }
-            )
+    valid_cases = test_queries(test_cases, args.db_path)
 
     print("\n" + "=" * 80)
     print(f"\nValidated {len(valid_cases)}/{len(test_cases)} queries successfully!")
 
-    output_file = "../../../../../Desktop/repos/cookbook-internal/recipes/take_home_interview/evaluation_data.json"
-    with open(output_file, "w") as f:
-        json.dump(valid_cases, f, indent=2)
-
-    print(f"\nEvaluation data saved to {output_file}")
-    print(f"Each test case includes the expected query results for validation.")
+    if args.output.endswith(".jsonl"):
+        write_jsonl(valid_cases, args.output)
+    else:
+        with open(args.output, "w") as f:
+            json.dump(valid_cases, f, indent=2)
 
-    conn.close()
+    print(f"\nEvaluation data saved to {args.output}")
+    print(f"Expected results are computed from the gold SQL on first use and cached per database state.")
 
 
 if __name__ == "__main__":
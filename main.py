@@ -1,34 +1,17 @@
-import json
-import time
+import asyncio
+import argparse
 from pathlib import Path
-from src.sql_generator import generate_sql, load_model_config
-from src.sql_response import get_answer
-from src.sql_evaluator import evaluate_answer
-from src.model_outputs import save_results_to_excel
-from src.prompts import basic_prompt, few_shot_prompt, agentic_prompt
-from src.custom_test_cases import CUSTOM_TEST_CASES
-
-# Load original evaluation data
-eval_data_path = Path("evaluation_data.json")
-with open(eval_data_path, 'r') as f:
-    original_eval_data = json.load(f)
-
-# Use only first 2 original test cases
-original_eval_data = original_eval_data[:2]
-
-# Convert custom test cases to evaluation format (expected_result already included)
-# Use only first 2 custom test cases
-custom_eval_data = [
-    {
-        "question": case["question"],
-        "sql": case["sql"],
-        "expected_result": case["expected_result"]
-    }
-    for case in CUSTOM_TEST_CASES[:2]
-]
-
-# Load model config
-config = load_model_config()
+from src.sql_generator import generate_sql_requests_async, load_model_config
+from src.inference_client import close_async_clients, set_base_url
+from src.response_cache import set_replay_mode
+from src.sql_response import set_query_budget, DEFAULT_TIME_LIMIT, DEFAULT_MAX_STEPS, DEFAULT_MAX_ROWS
+from src.parallel_eval import create_evaluation_pool, iter_evaluate_cases
+from src.run_journal import RunJournal, case_key, parse_shard, work_shard
+from src.gold_cache import GoldQueryError, get_gold_cache
+from src.model_outputs import ResultsWriter
+from src.prompts import basic_prompt, few_shot_prompt, agentic_prompt, prompt_token_report
+from src.schema_cache import get_schema_text
+from src.dataset import Dataset
 
 # Define prompts to test
 prompts = [
@@ -37,93 +20,320 @@ prompts = [
     ("prompt_3_agentic", agentic_prompt)
 ]
 
-# Get all models from config
-models = config["model"]
 
-print(f"Evaluating {len(original_eval_data)} original + {len(custom_eval_data)} custom test cases with {len(prompts)} prompts across {len(models)} models...\n")
-print("=" * 80)
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evaluate text-to-SQL prompts across models")
+    parser.add_argument("--original", nargs="+", default=["evaluation_data.json"],
+                        help="Original test cases: JSON/JSONL files, directories of JSONL shards or globs")
+    parser.add_argument("--custom", nargs="+", default=["custom_test_cases.jsonl"],
+                        help="Custom test cases: JSON/JSONL files, directories of JSONL shards or globs")
+    parser.add_argument("--limit", type=int, default=None, help="Test cases evaluated per test type")
+    parser.add_argument("--sample", type=float, default=None,
+                        help="Fraction of test cases to evaluate, picked deterministically by --seed")
+    parser.add_argument("--category", action="append", default=None,
+                        help="Only evaluate test cases of this category (repeatable)")
+    parser.add_argument("--shuffle", action="store_true", help="Deterministically shuffle test cases by --seed")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for --sample and --shuffle")
+    parser.add_argument("--chunk-size", type=int, default=500,
+                        help="Test cases loaded and evaluated at a time")
+    parser.add_argument("--base-url", default=None,
+                        help="OpenAI-compatible API to query instead of `base_url` in models.yaml "
+                             "(e.g. a local mock_server.py)")
+    parser.add_argument("--replay", action="store_true",
+                        help="Serve completions only from the response cache; fail on a cache miss")
+    parser.add_argument("--query-timeout", type=float, default=DEFAULT_TIME_LIMIT,
+                        help="Wall-clock seconds allowed per generated query (0 disables)")
+    parser.add_argument("--query-max-steps", type=int, default=DEFAULT_MAX_STEPS,
+                        help="SQLite VM instructions allowed per generated query (0 disables)")
+    parser.add_argument("--max-rows", type=int, default=DEFAULT_MAX_ROWS,
+                        help="Rows read per generated query before its result is truncated (0 disables)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes executing and scoring SQL (default: CPU count, 1 runs in-process)")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Questions packed into each API request (1 disables batched prompting)")
+    parser.add_argument("--stream", action="store_true", default=None,
+                        help="Stream completions and stop at the first complete SQL block")
+    parser.add_argument("--samples", type=int, default=None,
+                        help="Candidates sampled per (question, prompt) with execution-based voting "
+                             "(default: self_consistency.samples in models.yaml)")
+    parser.add_argument("--shard", type=shard_spec, default=None,
+                        help="Evaluate only shard i of N (0-based, e.g. 0/4) of the (model, prompt, case) triples; "
+                             "combine the shards' journals with merge_results.py")
+    parser.add_argument("--journal", default=None,
+                        help="Append-only JSONL journal of per-case results "
+                             "(default: model_output/run_journal.jsonl, or one file per shard)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip (model, prompt, case) results already in the journal (failed ones are retried)")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Start a fresh journal even if one exists at --journal")
+    parser.add_argument("--metrics", default=None,
+                        help="Prometheus text file receiving per-stage latency percentiles and token counts "
+                             "(default: model_output/metrics.prom, or one file per shard)")
+    args = parser.parse_args()
+    # Shards write independent partial results that merge_results.py combines
+    suffix = f".shard-{args.shard[0]}-of-{args.shard[1]}" if args.shard else ""
+    args.journal = args.journal or f"model_output/run_journal{suffix}.jsonl"
+    args.metrics = args.metrics or f"model_output/metrics{suffix}.prom"
+    args.results_name = f"all_models{suffix.replace('.', '_')}"
+    # Self-consistency votes per question, so it can't be combined with batched prompts
+    samples = args.samples
+    if samples is None:
+        samples = load_model_config().get("self_consistency", {}).get("samples", 1)
+    if samples > 1 and args.batch_size > 1:
+        parser.error(f"self-consistency sampling ({samples} samples) requires --batch-size 1, got {args.batch_size}")
+    journal = Path(args.journal)
+    if not (args.resume or args.overwrite) and journal.exists() and journal.stat().st_size:
+        parser.error(f"journal {args.journal} already exists: pass --resume to continue it or --overwrite to replace it")
+    return args
+
+
+def shard_spec(value):
+    """argparse type for --shard: "i/N" -> (i, N)."""
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
 
-def evaluate_test_cases(eval_data, test_type):
-    """Evaluate test cases and return results."""
-    results = {}
+
+async def generate_all_sql(requests, model_key, batch_size=1, stream=None, samples=None, telemetry=None):
+    """
+    Generate SQL for (question, prompt_func) requests, then release the loop's pooled connections.
+    
+    A request that still fails after retries yields its exception in place of
+    the SQL, so one failure doesn't discard the other completions.
+    """
+    try:
+        return await generate_sql_requests_async(requests, model_key, batch_size=batch_size, stream=stream,
+                                                 samples=samples, telemetry=telemetry, return_exceptions=True)
+    finally:
+        await close_async_clients()
+
+
+def failure_record(test_type, model_key, prompt_name, test_case, error, shard=None):
+    """Journal record of a (model, prompt, case) that could not be evaluated; resumed runs retry it."""
+    record = {'test_type': test_type, 'model': model_key, 'prompt': prompt_name, 'case': case_key(test_case),
+              'question': test_case['question'], 'error': error}
+    if shard:
+        record['shard'] = f"{shard[0]}/{shard[1]}"
+    return record
+
+
+def evaluate_test_cases(eval_data, test_type, models, journal, writer, executor=None, batch_size=1, stream=None,
+                        samples=None, start=0, shard=None):
+    """
+    Evaluate test cases, journaling and exporting each result as it is scored.
+    
+    (model, prompt, case) triples already in the journal are skipped; `main`
+    passes their journaled results to the writer before evaluation starts, so
+    the aggregates cover the whole run. `eval_data` may be one chunk of a larger dataset starting at
+    case number `start`. With `shard` (index, count), only the triples owned
+    by that shard are evaluated. Requests whose generation failed are
+    journaled with their error and retried by a resumed run.
+    """
+    case_ids = [case_key(test_case) for test_case in eval_data]
     
-    for idx, (model_key, model_path) in enumerate(models.items()):
+    if start == 0:
+        # Static prefixes are shared across questions and can be served from provider prompt caches
+        token_report = prompt_token_report(prompts, get_schema_text(), [case["question"] for case in eval_data])
+        for prompt_name, counts in token_report.items():
+            print(f"{prompt_name}: {counts['static_tokens']} static tokens + "
+                  f"{counts['avg_dynamic_tokens']:.1f} dynamic tokens per question")
+    
+    for model_key, model_path in models.items():
         model_name = model_path.split("/")[-1]
         print(f"\n{'='*80}")
         print(f"MODEL: {model_key} ({model_name}) - {test_type.upper()} TEST CASES")
         print(f"{'='*80}\n")
         
-        prompt_results = {prompt_name: [] for prompt_name, _ in prompts}
+        owned = [
+            (i, prompt_name, prompt_func)
+            for i in range(len(eval_data))
+            for prompt_name, prompt_func in prompts
+            if shard is None or work_shard(model_key, prompt_name, case_ids[i], shard[1]) == shard[0]
+        ]
+        pending = [
+            (i, prompt_name, prompt_func)
+            for i, prompt_name, prompt_func in owned
+            if not journal.is_completed(test_type, model_key, prompt_name, case_ids[i])
+        ]
+        completed = len(owned) - len(pending)
+        if completed:
+            print(f"Resuming: {completed} results already in journal")
         
-        for i, test_case in enumerate(eval_data, 1):
-            question = test_case["question"]
-            expected_sql = test_case["sql"]
-            expected_result = test_case["expected_result"]
+        if pending:
+            # Generate SQL for every pending (prompt, question) pair concurrently
+            print(f"Generating SQL for {len(pending)} (test case, prompt) pairs...")
+            generation_telemetry = []
+            generated = asyncio.run(generate_all_sql(
+                [(eval_data[i]["question"], prompt_func) for i, _, prompt_func in pending], model_key, batch_size, stream,
+                samples, generation_telemetry
+            ))
+            
+            # Group generated SQL by test case: case index -> [(prompt_name, sql), ...]
+            # With self-consistency sampling, sql is the list of candidates to vote on
+            sql_by_case = {}
+            sampling = {}
+            telemetry = {}
+            for (i, prompt_name, _), result, request_telemetry in zip(pending, generated, generation_telemetry):
+                if isinstance(result, Exception):
+                    error = f"{type(result).__name__}: {result}"
+                    print(f"Generation failed for test case {start + i + 1} ({prompt_name}): {error}")
+                    journal.append(failure_record(test_type, model_key, prompt_name, eval_data[i], error, shard))
+                    continue
+                telemetry[(i, prompt_name)] = request_telemetry
+                if isinstance(result, dict):
+                    sampling[(i, prompt_name)] = result
+                    result = result["candidates"]
+                sql_by_case.setdefault(i, []).append((prompt_name, result))
             
-            print(f"\nTest Case {i}/{len(eval_data)}")
-            print(f"Question: {question}")
+            # Gold results come with the test case or are computed on first use (in parallel)
+            # and cached per database state; cases whose gold query fails are skipped
+            missing = [i for i in sql_by_case if "expected_result" not in eval_data[i]]
+            computed = dict(zip(missing, get_gold_cache().get_many([eval_data[i]["sql"] for i in missing],
+                                                                   return_exceptions=True)))
+            for i, result in computed.items():
+                if isinstance(result, GoldQueryError):
+                    print(f"Skipping test case {start + i + 1}: {result}")
+                    for prompt_name, _ in sql_by_case.pop(i):
+                        journal.append(failure_record(test_type, model_key, prompt_name, eval_data[i], str(result),
+                                                      shard))
+            expected_results = [
+                computed[i] if i in computed else eval_data[i]["expected_result"] for i in sql_by_case
+            ]
             
-            print("\n1. Generating SQL...")
-            sql_results = generate_sql(question, prompts, model_key)
-            print(f"SQL: {sql_results}")
+            # Execute and score all generated SQL across the worker pool
+            print(f"Executing and evaluating {len(pending)} queries...")
+            all_evaluations = iter_evaluate_cases(
+                [
+                    (eval_data[i]["sql"], expected_result, [sql for _, sql in case_sqls])
+                    for (i, case_sqls), expected_result in zip(sql_by_case.items(), expected_results)
+                ],
+                executor
+            )
             
-            for prompt_name, sql in sql_results.items():
-                print(f"\n2. Executing SQL from {prompt_name}...")
-                answer = get_answer(sql)
+            for (i, case_sqls), evaluations in zip(sql_by_case.items(), all_evaluations):
+                print(f"\nTest Case {start + i + 1}")
+                print(f"Question: {eval_data[i]['question']}")
                 
-                print(f"\n3. Evaluating {prompt_name}...")
-                evaluation = evaluate_answer(
-                    answer,
-                    generated_sql=sql,
-                    expected_sql=expected_sql,
-                    expected_result=expected_result
-                )
-                print(f"Syntax OK: {evaluation['syntax_ok']}")
-                print(f"SQL Match: {evaluation['sql_match_percent']:.1f}%")
-                print(f"Answer Match: {evaluation['answer_match_percent']:.1f}%")
+                for (prompt_name, sql), evaluation in zip(case_sqls, evaluations):
+                    sample = sampling.get((i, prompt_name))
+                    if sample:
+                        sql = evaluation['selected_sql']
+                    print(f"\n{prompt_name} SQL: {sql}")
+                    if sample:
+                        print(f"Votes: {evaluation['votes']} of {evaluation['samples']} samples "
+                              f"({evaluation['failed']} failed), {sample['tokens']} tokens, "
+                              f"{sample['latency']:.2f}s sampling + {evaluation['vote_latency']:.2f}s voting")
+                    print(f"Syntax OK: {evaluation['syntax_ok']}")
+                    if evaluation['error_category']:
+                        print(f"Error: {evaluation['error_category']}")
+                    print(f"SQL Match: {evaluation['sql_match_percent']:.1f}%")
+                    print(f"Answer Match: {evaluation['answer_match_percent']:.1f}%")
+                    if evaluation['truncated']:
+                        print(f"Result truncated after {evaluation['rows_read']} rows")
+                    if evaluation['budget_exceeded']:
+                        print(f"Query aborted: exceeded {evaluation['budget_exceeded']} budget")
+                    
+                    request_telemetry = telemetry[(i, prompt_name)]
+                    timings = dict(request_telemetry['timings'],
+                                   execution=evaluation['execution_time'], scoring=evaluation['scoring_time'])
+                    print(f"Timings: queue {timings['queue_wait']:.2f}s, generation {timings['generation']:.2f}s, "
+                          f"execution {timings['execution'] * 1000:.1f}ms, scoring {timings['scoring'] * 1000:.1f}ms")
+                    
+                    record = {
+                        'test_type': test_type,
+                        'model': model_key,
+                        'prompt': prompt_name,
+                        'case': case_ids[i],
+                        'question': eval_data[i]['question'],
+                        'generated_sql': sql,
+                        'syntax_ok': evaluation['syntax_ok'],
+                        'error_category': evaluation['error_category'],
+                        'sql_match': evaluation['sql_match_percent'],
+                        'answer_match': evaluation['answer_match_percent'],
+                        'budget_exceeded': evaluation['budget_exceeded'],
+                        'rows_read': evaluation['rows_read'],
+                        'truncated': evaluation['truncated'],
+                        'timings': timings,
+                        'prompt_tokens': request_telemetry['prompt_tokens'],
+                        'completion_tokens': request_telemetry['completion_tokens'],
+                        'tokens_per_second': request_telemetry['tokens_per_second'],
+                        'cached': request_telemetry['cached']
+                    }
+                    if shard:
+                        record['shard'] = f"{shard[0]}/{shard[1]}"
+                    if sample:
+                        record.update({
+                            'samples': evaluation['samples'],
+                            'votes': evaluation['votes'],
+                            'failed_samples': evaluation['failed'],
+                            'sample_tokens': sample['tokens'],
+                            'sample_latency': sample['latency'],
+                            'vote_latency': evaluation['vote_latency']
+                        })
+                    journal.append(record)
+                    writer.add_result(record)
                 
-                prompt_results[prompt_name].append({
-                    'sql_match': evaluation['sql_match_percent'],
-                    'answer_match': evaluation['answer_match_percent']
-                })
-            
-            print("=" * 80)
-        
-        results[model_key] = prompt_results
-        
-        if idx < len(models) - 1:
-            print(f"\nWaiting 20 seconds before next model...")
-            time.sleep(20)
-    
-    return results
-
-# Evaluate original test cases
-print("\n" + "="*80)
-print("EVALUATING ORIGINAL TEST CASES")
-print("="*80)
-original_results = evaluate_test_cases(original_eval_data, "original")
-
-# Evaluate custom test cases
-print("\n" + "="*80)
-print("EVALUATING CUSTOM TEST CASES")
-print("="*80)
-custom_results = evaluate_test_cases(custom_eval_data, "custom")
+                print("=" * 80)
 
-# Convert to prompt_results format
-all_prompt_results = {}
-original_prompt_results = {}
-custom_prompt_results = {}
 
-for model_key, prompt_results in original_results.items():
-    for prompt_name, results in prompt_results.items():
-        key = f"{model_key}__{prompt_name}"
-        all_prompt_results[key] = results
-        original_prompt_results[key] = results
+def main():
+    args = parse_args()
+    set_base_url(args.base_url)
+    set_replay_mode(args.replay)
+    set_query_budget(args.query_timeout, args.query_max_steps, args.max_rows)
+    
+    # Test cases are streamed from disk and evaluated a chunk at a time
+    # (expected results come with the cases or from the gold cache)
+    selection = dict(categories=args.category, sample=args.sample, shuffle=args.shuffle, seed=args.seed,
+                     limit=args.limit)
+    datasets = {
+        "original": Dataset(args.original, **selection),
+        "custom": Dataset(args.custom, **selection),
+    }
+    
+    # Load model config
+    config = load_model_config()
+    
+    # Get all models from config
+    models = config["model"]
+    
+    print(f"Evaluating original ({', '.join(datasets['original'].files)}) + custom "
+          f"({', '.join(datasets['custom'].files)}) test cases with {len(prompts)} prompts across {len(models)} models...\n")
+    if args.shard:
+        print(f"Shard {args.shard[0]}/{args.shard[1]}: partial results go to {args.journal}")
+    print("=" * 80)
+    
+    journal = RunJournal(args.journal, resume=args.resume, overwrite=args.overwrite)
+    writer = ResultsWriter(args.results_name)
+    if args.resume:
+        # Journaled results are streamed from disk rather than held in memory
+        for record in journal.records():
+            writer.add_result(record)
+        print(f"Loaded {writer.detail_rows} journaled results from {args.journal}")
+    executor = create_evaluation_pool(max_workers=args.workers) if args.workers != 1 else None
+    try:
+        # Evaluate original test cases, then custom test cases
+        for test_type, dataset in datasets.items():
+            print("\n" + "="*80)
+            print(f"EVALUATING {test_type.upper()} TEST CASES")
+            print("="*80)
+            start = 0
+            for chunk in dataset.batches(args.chunk_size):
+                evaluate_test_cases(chunk, test_type, models, journal, writer, executor, args.batch_size, args.stream,
+                                    args.samples, start, args.shard)
+                start += len(chunk)
+    finally:
+        if executor:
+            executor.shutdown()
+        journal.close()
+    
+    if journal.failed:
+        print(f"\n{journal.failed} (model, prompt, case) results failed; run again with --resume to retry them")
+    writer.close()
+    metrics_path = writer.telemetry.write_prometheus(args.metrics)
+    print(f"Metrics saved to: {metrics_path}")
 
-for model_key, prompt_results in custom_results.items():
-    for prompt_name, results in prompt_results.items():
-        key = f"{model_key}__{prompt_name}"
-        all_prompt_results[key] = all_prompt_results.get(key, []) + results
-        custom_prompt_results[key] = results
 
-save_results_to_excel(all_prompt_results, "all_models", original_prompt_results, custom_prompt_results)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+from pathlib import Path
+from src.dataset import expand_paths
+from src.model_outputs import ResultsWriter
+from src.run_journal import RunJournal, parse_shard, read_journal
+
+
+def merge_records(paths: list, stats: dict):
+    """
+    Yield the records of several shard journals, once per (test_type, model, prompt, case).
+
+    Failed requests (records with an 'error') are skipped. Fills `stats` with
+    'results', 'duplicates', 'failed' (keys with no successful record in any
+    journal, set once all records are read) and 'shards' (shard count -> indices seen).
+    """
+    seen = set()
+    failed = set()
+    stats.update(results=0, duplicates=0, failed=0, shards={})
+    for path in paths:
+        for record in read_journal(path):
+            key = (record["test_type"], record["model"], record["prompt"], record["case"])
+            if record.get("error"):
+                failed.add(key)
+                continue
+            if key in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(key)
+            if record.get("shard"):
+                index, count = parse_shard(record["shard"])
+                stats["shards"].setdefault(count, set()).add(index)
+            stats["results"] += 1
+            yield record
+    # Failures retried successfully by a resumed run don't count
+    stats["failed"] = len(failed - seen)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Merge the partial results of sharded runs (main.py --shard i/N) into one report"
+    )
+    parser.add_argument("journals", nargs="*", default=["model_output/run_journal.shard-*-of-*.jsonl"],
+                        help="Shard journals: files, directories or glob patterns")
+    parser.add_argument("--output-name", default="all_models", help="Identifier in the Excel file name")
+    parser.add_argument("--output-folder", default="model_output")
+    parser.add_argument("--metrics", default="model_output/metrics.prom",
+                        help="Prometheus text file for the merged latency percentiles and token counts")
+    parser.add_argument("--journal", default=None,
+                        help="Also write the merged records as one journal (usable with main.py --resume)")
+    args = parser.parse_args()
+
+    paths = expand_paths(args.journals)
+    # Opening the merged journal truncates it before the inputs are read
+    if args.journal and Path(args.journal).resolve() in {Path(path).resolve() for path in paths}:
+        parser.error(f"--journal {args.journal} is one of the input journals; write the merged journal elsewhere")
+    print(f"Merging {len(paths)} journal(s):")
+    for path in paths:
+        print(f"  - {path}")
+
+    writer = ResultsWriter(args.output_name, args.output_folder)
+    merged = RunJournal(args.journal, overwrite=True) if args.journal else None
+    stats = {}
+    try:
+        for record in merge_records(paths, stats):
+            writer.add_result(record)
+            if merged:
+                merged.append(record)
+    finally:
+        if merged:
+            merged.close()
+
+    print(f"\n{stats['results']} results merged, {stats['duplicates']} duplicates skipped")
+    if stats["failed"]:
+        print(f"{stats['failed']} (model, prompt, case) results failed in every journal (resume their shards to retry them)")
+    for count, indices in sorted(stats["shards"].items()):
+        missing = sorted(set(range(count)) - indices)
+        if missing:
+            print(f"Warning: no results from shard(s) {', '.join(f'{i}/{count}' for i in missing)}")
+        else:
+            print(f"All {count} shards present")
+
+    writer.close()
+    metrics_path = writer.telemetry.write_prometheus(args.metrics)
+    print(f"Metrics saved to: {metrics_path}")
+    if merged:
+        print(f"Merged journal saved to: {args.journal}")
+
+
+if __name__ == "__main__":
+    main()
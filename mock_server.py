@@ -0,0 +1,63 @@
+import argparse
+from src.dataset import load_test_cases
+from src.mock_model import FaultProfile, MockModel, MockServer
+from src.response_cache import ResponseCache
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Serve an OpenAI-compatible chat-completions API that answers with gold SQL, for offline load tests"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--eval-data", nargs="+", default=["evaluation_data.json", "custom_test_cases.jsonl"],
+                        help="Dataset files, shard directories or globs whose gold SQL answers their questions")
+    parser.add_argument("--recorded", help="Response cache file (e.g. .cache/llm_responses.sqlite) to replay "
+                                           "recorded completions from; other requests get gold SQL")
+    parser.add_argument("--default-sql", default="SELECT 1", help="Answer for unknown questions")
+    parser.add_argument("--reasoning-chars", type=int, default=0,
+                        help="Filler reasoning emitted before the SQL block, to mimic long outputs")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean seconds before each response starts")
+    parser.add_argument("--latency-distribution", default="fixed",
+                        choices=["fixed", "uniform", "exponential", "lognormal"])
+    parser.add_argument("--latency-spread", type=float, default=0.5,
+                        help="Relative spread (uniform) or sigma (lognormal) of the latency")
+    parser.add_argument("--chunk-latency", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with HTTP 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds of injected 429s")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for latency and fault sampling")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    recorded = ResponseCache(args.recorded, max_bytes=2**63 - 1) if args.recorded else None
+    reasoning = ("Let me work out which tables and joins are needed. " * (args.reasoning_chars // 50 + 1))
+    model = MockModel(load_test_cases(args.eval_data), default_sql=args.default_sql,
+                      reasoning=reasoning[:args.reasoning_chars], recorded=recorded)
+    faults = FaultProfile(
+        latency=args.latency,
+        latency_distribution=args.latency_distribution,
+        spread=args.latency_spread,
+        chunk_latency=args.chunk_latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    server = MockServer(model, faults, args.host, args.port, verbose=args.verbose)
+    print(f"Mock model serving {len(model.answers)} questions at {server.base_url}")
+    print(f"Run the evaluation against it with: FIREWORKS_API_KEY=mock python main.py --base-url {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
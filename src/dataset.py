@@ -0,0 +1,153 @@
+import glob
+import hashlib
+import heapq
+import json
+from pathlib import Path
+from src.run_journal import case_key
+
+
+def _case_hash(test_case: dict, seed: int) -> int:
+    """Deterministic 64-bit hash of a test case, independent of its position in the files."""
+    digest = hashlib.sha1(f"{seed}:{case_key(test_case)}".encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def expand_paths(paths) -> list:
+    """
+    Resolve dataset paths: files, directories (their `*.jsonl` shards) and glob patterns.
+
+    Returns:
+        List of files; glob matches and directory shards are sorted by name
+    """
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    files = []
+    for path in map(str, paths):
+        if glob.has_magic(path):
+            matches = sorted(glob.glob(path))
+            if not matches:
+                raise FileNotFoundError(f"No dataset files match {path}")
+            files += matches
+        elif Path(path).is_dir():
+            files += sorted(str(p) for p in Path(path).glob("*.jsonl"))
+        elif Path(path).exists():
+            files.append(path)
+        else:
+            raise FileNotFoundError(f"Dataset file not found: {path}")
+    return files
+
+
+def _read_records(path: str):
+    """
+    Yield (locator, record) pairs from one file.
+
+    JSONL files are read line by line and located by byte offset; a `.json`
+    file holds a single array (the legacy format) and is loaded whole.
+    """
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            yield from enumerate(json.load(f))
+        return
+    with open(path, "rb") as f:
+        while True:
+            offset = f.tell()
+            line = f.readline()
+            if not line:
+                return
+            if line.strip():
+                yield offset, json.loads(line)
+
+
+def _read_record(path: str, locator: int) -> dict:
+    """Read the JSONL record at a byte offset returned by `_read_records`."""
+    with open(path, "rb") as f:
+        f.seek(locator)
+        return json.loads(f.readline())
+
+
+class Dataset:
+    """
+    Evaluation test cases streamed lazily from JSONL files or shards.
+
+    Records are dicts with 'question' and 'sql', plus optional 'category' and
+    'expected_result'. Only the records being yielded are held in memory, so
+    eval sets much larger than RAM can be used. Selection is deterministic:
+
+    - `categories` keeps cases whose 'category' is listed
+    - `sample` keeps a fraction of cases, chosen by a hash of each case and `seed`
+    - `shuffle` orders cases by that hash instead of file order; the files are
+      indexed first (byte offsets only), then records are read back one by one
+    - `limit` stops after that many cases (with `shuffle`, a uniform sample of that size)
+
+    Args:
+        paths: File, directory of `*.jsonl` shards, glob pattern, or a list of them
+        categories: Categories to keep (None keeps all)
+        sample: Fraction of cases to keep, between 0 and 1 (None keeps all)
+        shuffle: Deterministically shuffle the cases
+        seed: Seed for sampling and shuffling
+        limit: Maximum number of cases (None for no limit)
+    """
+
+    def __init__(self, paths, categories: list = None, sample: float = None, shuffle: bool = False,
+                 seed: int = 0, limit: int = None):
+        self.files = expand_paths(paths)
+        self.categories = set(categories) if categories else None
+        self.sample = sample
+        self.shuffle = shuffle
+        self.seed = seed
+        self.limit = limit
+
+    def _selected(self):
+        """Yield (file index, locator, record) for the cases passing the category and sample filters."""
+        threshold = self.sample * 2**64 if self.sample is not None else None
+        for file_index, path in enumerate(self.files):
+            for locator, record in _read_records(path):
+                if self.categories is not None and record.get("category") not in self.categories:
+                    continue
+                if threshold is not None and _case_hash(record, self.seed) >= threshold:
+                    continue
+                yield file_index, locator, record
+
+    def __iter__(self):
+        if self.limit is not None and self.limit <= 0:
+            return
+        if not self.shuffle:
+            for count, (_, _, record) in enumerate(self._selected(), 1):
+                yield record
+                if count == self.limit:
+                    return
+            return
+
+        # Keep only (hash, file, offset) per JSONL case, then read the records back in hash order;
+        # records of `.json` files are resident anyway and are kept as they are
+        index = (
+            (_case_hash(record, self.seed), file_index, locator,
+             record if self.files[file_index].endswith(".json") else None)
+            for file_index, locator, record in self._selected()
+        )
+        order = heapq.nsmallest(self.limit, index) if self.limit is not None else sorted(index)
+        for _, file_index, locator, record in order:
+            yield record if record is not None else _read_record(self.files[file_index], locator)
+
+    def batches(self, size: int):
+        """Yield lists of up to `size` test cases, so at most one batch is resident."""
+        batch = []
+        for record in self:
+            batch.append(record)
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def load_test_cases(paths, **options) -> list:
+    """All test cases of a (small) dataset as a list; see `Dataset` for the options."""
+    return list(Dataset(paths, **options))
+
+
+def write_jsonl(test_cases, path: str):
+    """Write test cases as JSONL, one case per line."""
+    with open(path, "w", encoding="utf-8") as f:
+        for test_case in test_cases:
+            f.write(json.dumps(test_case, ensure_ascii=False) + "\n")
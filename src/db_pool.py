@@ -0,0 +1,107 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class ReadOnlyConnectionPool:
+    """
+    Thread-safe pool of read-only SQLite connections to one database.
+
+    Connections are opened with `mode=ro` and `PRAGMA query_only`, so generated
+    SQL can never modify the database. Each connection keeps a large prepared
+    statement cache and its parsed schema across checkouts.
+    """
+
+    def __init__(self, db_path: str, size: int = 4, cached_statements: int = 512):
+        self.db_uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        self.size = size
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_uri,
+            uri=True,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def acquire(self, timeout: float = None) -> sqlite3.Connection:
+        """Check out a connection, opening a new one while the pool is below `size`."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+        return self._idle.get(timeout=timeout)
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool."""
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        """Context manager that checks a connection out and always returns it."""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close all idle connections."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str = "Chinook.db", size: int = 4) -> ReadOnlyConnectionPool:
+    """
+    Return the shared read-only pool for a database.
+
+    Pools are per process: a forked worker gets its own connections instead of
+    inheriting its parent's.
+
+    Args:
+        db_path: Path to the SQLite database
+        size: Maximum number of connections, used when the pool is first created
+
+    Returns:
+        ReadOnlyConnectionPool for `db_path`
+    """
+    key = (str(Path(db_path).resolve()), os.getpid())
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ReadOnlyConnectionPool(db_path, size=size)
+        return _pools[key]
+
+
+def rows_as_dicts(cursor, rows) -> list:
+    """Convert result tuples to dictionaries keyed by column name."""
+    columns = [col[0] for col in cursor.description] if cursor.description else []
+    return [dict(zip(columns, row)) for row in rows]
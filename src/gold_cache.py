@@ -0,0 +1,211 @@
+import base64
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from src.db_pool import get_pool
+from src.schema_cache import db_fingerprint
+
+DEFAULT_GOLD_CACHE_PATH = ".cache/gold_results.sqlite"
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class GoldQueryError(RuntimeError):
+    """Raised when a gold SQL query fails to execute."""
+
+
+def gold_key(sql: str, fingerprint: str) -> str:
+    """Cache key for a gold query's result on one state of a database."""
+    return hashlib.sha256(f"{fingerprint}\n{sql.strip()}".encode()).hexdigest()
+
+
+def _encode_value(value):
+    """JSON form of values json can't encode: BLOBs become {"b64": ...}."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"b64": base64.b64encode(bytes(value)).decode("ascii")}
+    raise TypeError(f"Cannot encode {type(value).__name__} in a gold result")
+
+
+def _decode_value(obj: dict):
+    return base64.b64decode(obj["b64"]) if "b64" in obj else obj
+
+
+def _encode(columns: list, rows: list) -> bytes:
+    """Column names once plus row tuples, JSON-encoded and zlib-compressed."""
+    return zlib.compress(json.dumps([columns, rows], separators=(",", ":"), default=_encode_value).encode())
+
+
+def _decode(blob: bytes) -> list:
+    columns, rows = json.loads(zlib.decompress(blob), object_hook=_decode_value)
+    return [dict(zip(columns, row)) for row in rows]
+
+
+class GoldResultCache:
+    """
+    Gold query results, computed on first use and stored compactly on disk.
+
+    Entries are keyed by the hash of the gold SQL and the database fingerprint,
+    so any change to the database invalidates them. Missing results are
+    computed in parallel on read-only pooled connections. The most recently
+    used decoded results are kept in memory; older ones are decoded again
+    from disk.
+
+    Args:
+        path: SQLite file holding the cache
+        max_workers: Threads executing missing gold queries
+        memory_size: Decoded results kept in memory
+    """
+
+    def __init__(self, path: str = DEFAULT_GOLD_CACHE_PATH, max_workers: int = 4, memory_size: int = 256):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS gold_results ("
+            "key TEXT PRIMARY KEY, sql TEXT, row_count INTEGER, result BLOB, created_at REAL)"
+        )
+
+    def _load(self, keys: list) -> dict:
+        """Return {key: rows} for the keys already cached on disk."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                row = self._conn.execute("SELECT result FROM gold_results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    found[key] = _decode(row[0])
+        return found
+
+    def _recall(self, keys: list) -> dict:
+        """Return {key: rows} for the keys held in memory, marking them recently used."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+        return found
+
+    def _remember(self, key: str, rows: list):
+        with self._lock:
+            self._memory[key] = rows
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _store(self, key: str, sql: str, columns: list, rows: list):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO gold_results (key, sql, row_count, result, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, sql, len(rows), _encode(columns, rows), time.time()),
+            )
+
+    @staticmethod
+    def _execute(sql: str, db_path: str):
+        with get_pool(db_path).connection() as conn:
+            try:
+                cursor = conn.execute(sql)
+                rows = [list(row) for row in cursor.fetchall()]
+            except sqlite3.Error as e:
+                raise GoldQueryError(f"Gold query failed: {e}\n{sql}") from e
+            columns = [col[0] for col in cursor.description] if cursor.description else []
+        return columns, rows
+
+    def _try_execute(self, sql: str, db_path: str):
+        try:
+            return self._execute(sql, db_path)
+        except GoldQueryError as e:
+            return e
+
+    def get_many(self, sqls: list, db_path: str = "Chinook.db", return_exceptions: bool = False) -> list:
+        """
+        Results of many gold queries, executing the missing ones in parallel.
+
+        Args:
+            sqls: Gold SQL queries
+            db_path: Path to the SQLite database
+            return_exceptions: Return a failed query's GoldQueryError in place of its
+                               result instead of raising it
+
+        Returns:
+            List of results (lists of row dicts), in the order of `sqls`
+
+        Raises:
+            GoldQueryError: If a gold query fails to execute (unless `return_exceptions`)
+        """
+        fingerprint = db_fingerprint(db_path)
+        keys = [gold_key(sql, fingerprint) for sql in sqls]
+        unique = list(dict.fromkeys(keys))
+
+        results = self._recall(unique)
+        missing = [key for key in unique if key not in results]
+        if missing:
+            # Results read from disk or executed now, to keep in memory
+            fresh = self._load(missing)
+            results.update(fresh)
+            to_run = {key: sql for key, sql in zip(keys, sqls) if key not in results}
+            if to_run:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(to_run))) as executor:
+                    executed = executor.map(lambda sql: self._try_execute(sql, db_path), to_run.values())
+                    for (key, sql), outcome in zip(to_run.items(), executed):
+                        if isinstance(outcome, GoldQueryError):
+                            # Failures are not cached, so a fixed gold query runs again
+                            results[key] = outcome
+                            continue
+                        columns, rows = outcome
+                        self._store(key, sql, columns, rows)
+                        results[key] = fresh[key] = [dict(zip(columns, row)) for row in rows]
+            for key, rows in fresh.items():
+                self._remember(key, rows)
+
+        if not return_exceptions:
+            for key in keys:
+                if isinstance(results[key], GoldQueryError):
+                    raise results[key]
+        return [results[key] for key in keys]
+
+    def get(self, sql: str, db_path: str = "Chinook.db") -> list:
+        """Result of one gold query (see `get_many`)."""
+        return self.get_many([sql], db_path)[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_gold_cache(path: str = DEFAULT_GOLD_CACHE_PATH) -> GoldResultCache:
+    """Return the shared gold-result cache stored at `path`."""
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = GoldResultCache(path)
+        return _caches[path]
+
+
+def attach_expected_results(test_cases: list, db_path: str = "Chinook.db", cache: GoldResultCache = None) -> list:
+    """
+    Fill in `expected_result` for test cases that only have a question and gold SQL.
+
+    Args:
+        test_cases: List of dicts with 'sql'; modified in place
+        db_path: Path to the SQLite database
+        cache: Gold-result cache (defaults to the shared one)
+
+    Returns:
+        The same list of test cases
+    """
+    cache = cache or get_gold_cache()
+    results = cache.get_many([case["sql"] for case in test_cases], db_path)
+    for case, result in zip(test_cases, results):
+        case["expected_result"] = result
+    return test_cases
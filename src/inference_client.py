@@ -0,0 +1,135 @@
+import asyncio
+import importlib.util
+import threading
+import weakref
+import httpx
+from openai import OpenAI, AsyncOpenAI
+
+FIREWORKS_BASE_URL = "https://api.fireworks.ai/inference/v1"
+
+# HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 keep-alive without it
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_clients = {}
+# Async clients are bound to the event loop they were created on
+_async_clients = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+# Transport replacing the network for clients created from now on (see `set_transport`)
+_transport = None
+# Base URL overriding models.yaml (see `set_base_url`)
+_base_url = None
+
+
+def set_transport(transport):
+    """
+    Route clients created from now on through an httpx transport instead of the network.
+
+    Used to run the pipeline against a mock model (e.g. `mock_model.MockTransport`).
+    Call before the first request; existing clients keep their connections.
+
+    Args:
+        transport: httpx transport supporting sync and async requests, or None to restore the network
+    """
+    global _transport
+    _transport = transport
+
+
+def set_base_url(base_url: str):
+    """
+    Send requests to another OpenAI-compatible API (e.g. a local `mock_model.MockServer`).
+
+    Takes precedence over `base_url` in models.yaml.
+
+    Args:
+        base_url: API base URL, or None to use the configured one
+    """
+    global _base_url
+    _base_url = base_url
+
+
+def resolve_base_url(config: dict = None) -> str:
+    """Base URL for API clients: the `set_base_url` override, then `base_url` in models.yaml, then Fireworks."""
+    return _base_url or (config or {}).get("base_url") or FIREWORKS_BASE_URL
+
+
+def _http_options(config: dict) -> dict:
+    """Build httpx connection-pool options from the `http_client` section of models.yaml."""
+    options = (config or {}).get("http_client", {})
+    if _transport is not None:
+        return dict(transport=_transport)
+    return dict(
+        limits=httpx.Limits(
+            max_connections=options.get("max_connections", 100),
+            max_keepalive_connections=options.get("max_keepalive_connections", 20),
+            keepalive_expiry=options.get("keepalive_expiry", 60.0),
+        ),
+        timeout=httpx.Timeout(options.get("timeout", 120.0), connect=options.get("connect_timeout", 10.0)),
+        http2=options.get("http2", True) and HTTP2_AVAILABLE,
+    )
+
+
+def get_client(api_key: str, base_url: str = FIREWORKS_BASE_URL, config: dict = None) -> OpenAI:
+    """
+    Return the long-lived client for a base_url/API key pair.
+
+    The client owns a pooled httpx connection, so TLS handshakes are paid
+    once per process instead of once per request.
+
+    Args:
+        api_key: API key for the inference provider
+        base_url: OpenAI-compatible API base URL
+        config: Parsed models.yaml (pool limits are read from `http_client`)
+
+    Returns:
+        Shared OpenAI client
+    """
+    key = (base_url, api_key)
+    with _clients_lock:
+        if key not in _clients:
+            # Retries are handled by the rate limiter, not the SDK
+            _clients[key] = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=0,
+                http_client=httpx.Client(**_http_options(config)),
+            )
+        return _clients[key]
+
+
+def get_async_client(api_key: str, base_url: str = FIREWORKS_BASE_URL, config: dict = None) -> AsyncOpenAI:
+    """
+    Return the long-lived async client for a base_url/API key pair on the running event loop.
+
+    Must be called from within a coroutine. Each event loop gets its own
+    pooled connection, since async connections cannot be shared across loops.
+    """
+    loop = asyncio.get_running_loop()
+    key = (base_url, api_key)
+    with _clients_lock:
+        loop_clients = _async_clients.setdefault(loop, {})
+        if key not in loop_clients:
+            loop_clients[key] = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=0,
+                http_client=httpx.AsyncClient(**_http_options(config)),
+            )
+        return loop_clients[key]
+
+
+def close_clients():
+    """Close all shared sync clients and their connection pools."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+async def close_async_clients():
+    """Close the shared async clients belonging to the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        loop_clients = _async_clients.pop(loop, {})
+    for client in loop_clients.values():
+        await client.close()
@@ -0,0 +1,288 @@
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+
+# Questions as rendered by the prompt templates: <question>, <question id="N"> or "Question: ..."
+_TAGGED_QUESTION_RE = re.compile(r'<question(?: id="(\d+)")?>\s*(.*?)\s*</question>', re.S)
+_PLAIN_QUESTION_RE = re.compile(r"^Question: (.*)$", re.M)
+
+# Characters of completion text per streamed chunk
+STREAM_CHUNK_CHARS = 16
+
+
+class MockModel:
+    """
+    Stand-in for a chat-completions model that answers with known SQL.
+
+    The question is recovered from the rendered prompt and answered with the
+    gold SQL of the matching test case, wrapped in `<sql_query>` tags (or
+    id-tagged blocks for batched prompts). Unknown questions get `default_sql`.
+    Requests found in a recorded response cache are answered with the
+    recorded completion instead.
+
+    Args:
+        test_cases: Dicts with 'question' and 'sql'
+        default_sql: Answer for questions not in `test_cases`
+        reasoning: Text emitted before the SQL block, to mimic reasoning output
+        recorded: ResponseCache of real completions to replay, if any
+    """
+
+    def __init__(self, test_cases: list, default_sql: str = "SELECT 1", reasoning: str = "", recorded=None):
+        self.answers = {case["question"].strip(): case["sql"] for case in test_cases}
+        self.default_sql = default_sql
+        self.reasoning = reasoning
+        self.recorded = recorded
+
+    def answer(self, prompt: str) -> str:
+        """Completion text for a rendered prompt."""
+        tagged = _TAGGED_QUESTION_RE.findall(prompt)
+        if tagged and tagged[0][0]:
+            return self.reasoning + "\n".join(
+                f'<sql_query id="{query_id}">\n{self.answers.get(question, self.default_sql)}\n</sql_query>'
+                for query_id, question in tagged
+            )
+        if tagged:
+            question = tagged[-1][1]
+        else:
+            plain = _PLAIN_QUESTION_RE.findall(prompt)
+            question = plain[-1].strip() if plain else ""
+        return f"{self.reasoning}<sql_query>\n{self.answers.get(question, self.default_sql)}\n</sql_query>"
+
+    def texts(self, body: dict) -> list:
+        """One completion text per requested choice (`n`), cut at the first stop sequence."""
+        n = body.get("n") or 1
+        cached = self.recorded.get(self.recorded.make_key(body)) if self.recorded else None
+        if cached is not None:
+            # Requests with `n` are recorded as a JSON list of choices
+            texts = json.loads(cached) if "n" in body else [cached]
+        else:
+            texts = [self.answer(body["messages"][-1]["content"])] * n
+        stop = body.get("stop") or []
+        for sequence in [stop] if isinstance(stop, str) else stop:
+            texts = [text.split(sequence, 1)[0] for text in texts]
+        return texts
+
+    @staticmethod
+    def _usage(body: dict, texts: list) -> dict:
+        prompt_tokens = sum(len(m["content"]) for m in body["messages"]) // 4
+        completion_tokens = sum(len(text) for text in texts) // 4
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def completion(self, body: dict) -> dict:
+        """OpenAI-style chat completion response for a request body."""
+        texts = self.texts(body)
+        return {
+            "id": f"mock-{time.monotonic_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [
+                {"index": i, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                for i, text in enumerate(texts)
+            ],
+            "usage": self._usage(body, texts),
+        }
+
+    def completion_chunks(self, body: dict):
+        """
+        OpenAI-style `chat.completion.chunk` objects for a streamed request.
+
+        Only the first choice is streamed. A final usage chunk is added when
+        the request sets `stream_options.include_usage`.
+        """
+        text = self.texts(body)[0]
+        base = {"id": f"mock-{time.monotonic_ns()}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": body.get("model", "mock")}
+        yield dict(base, choices=[{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+        for start in range(0, len(text), STREAM_CHUNK_CHARS):
+            delta = {"content": text[start:start + STREAM_CHUNK_CHARS]}
+            yield dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": None}])
+        yield dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield dict(base, choices=[], usage=self._usage(body, [text]))
+
+
+def sse_events(chunks) -> list:
+    """Encode completion chunks as server-sent events, ending with `data: [DONE]`."""
+    events = [f"data: {json.dumps(chunk)}\n\n".encode() for chunk in chunks]
+    events.append(b"data: [DONE]\n\n")
+    return events
+
+
+@dataclass
+class FaultProfile:
+    """
+    Latency and failures injected into mocked responses.
+
+    Latency is the delay before the response starts (time to first byte),
+    drawn from `latency_distribution`: "fixed", "uniform" (latency ± spread x
+    latency), "exponential" or "lognormal" (mean `latency`, sigma `spread`).
+    """
+    latency: float = 0.0
+    latency_distribution: str = "fixed"
+    spread: float = 0.5
+    chunk_latency: float = 0.0  # seconds between streamed chunks
+    error_rate: float = 0.0  # fraction of requests answered with HTTP 500
+    rate_limit_rate: float = 0.0  # fraction of requests answered with HTTP 429
+    retry_after: float = 1.0  # Retry-After of injected 429 responses
+    seed: int = None
+
+    def __post_init__(self):
+        if self.latency_distribution not in ("fixed", "uniform", "exponential", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {self.latency_distribution}")
+        self._rng = random.Random(self.seed)
+
+    def sample_latency(self) -> float:
+        """Draw the delay before one response."""
+        if self.latency <= 0:
+            return 0.0
+        if self.latency_distribution == "uniform":
+            return max(0.0, self._rng.uniform(self.latency * (1 - self.spread), self.latency * (1 + self.spread)))
+        if self.latency_distribution == "exponential":
+            return self._rng.expovariate(1 / self.latency)
+        if self.latency_distribution == "lognormal":
+            return self._rng.lognormvariate(math.log(self.latency) - self.spread ** 2 / 2, self.spread)
+        return self.latency
+
+    def sample_fault(self):
+        """Return (status, headers, body) of an injected error response, or None to answer normally."""
+        draw = self._rng.random()
+        if draw < self.rate_limit_rate:
+            return 429, {"retry-after": f"{self.retry_after:g}"}, \
+                {"error": {"message": "Injected rate limit", "type": "rate_limit_error", "code": 429}}
+        if draw < self.rate_limit_rate + self.error_rate:
+            return 500, {}, {"error": {"message": "Injected server error", "type": "server_error", "code": 500}}
+        return None
+
+
+def mock_response(model: MockModel, faults: FaultProfile, path: str, body: bytes):
+    """
+    Answer one HTTP request to the mocked API.
+
+    Returns:
+        Tuple of (status, headers, [body chunks]); streamed completions have one
+        server-sent event per chunk
+    """
+    if not path.endswith("/chat/completions"):
+        return 404, {"content-type": "application/json"}, \
+            [json.dumps({"error": {"message": f"Unknown path {path}"}}).encode()]
+    fault = faults.sample_fault()
+    if fault:
+        status, headers, error = fault
+        return status, dict(headers, **{"content-type": "application/json"}), [json.dumps(error).encode()]
+    request = json.loads(body or b"{}")
+    if request.get("stream"):
+        return 200, {"content-type": "text/event-stream"}, sse_events(model.completion_chunks(request))
+    return 200, {"content-type": "application/json"}, [json.dumps(model.completion(request)).encode()]
+
+
+class MockTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    httpx transport that serves chat completions from a MockModel, without network access.
+
+    Streamed responses are delivered in one piece (`chunk_latency` is not applied).
+
+    Args:
+        model: MockModel answering the requests
+        latency: Seconds each response is delayed by (ignored when `faults` is given)
+        faults: FaultProfile with the latency distribution and injected errors
+    """
+
+    def __init__(self, model: MockModel, latency: float = 0.0, faults: FaultProfile = None):
+        self.model = model
+        self.faults = faults or FaultProfile(latency=latency)
+
+    def _response(self, request: httpx.Request) -> httpx.Response:
+        status, headers, chunks = mock_response(self.model, self.faults, request.url.path, request.content)
+        return httpx.Response(status, headers=headers, content=b"".join(chunks))
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        delay = self.faults.sample_latency()
+        if delay:
+            time.sleep(delay)
+        return self._response(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        delay = self.faults.sample_latency()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._response(request)
+
+
+class _MockRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps client connections alive, as with the real API
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("content-length") or 0))
+        delay = self.server.faults.sample_latency()
+        if delay:
+            time.sleep(delay)
+        status, headers, chunks = mock_response(self.server.model, self.server.faults, self.path, body)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if headers.get("content-type") != "text/event-stream":
+            content = b"".join(chunks)
+            self.send_header("content-length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+            return
+        # Server-sent events go out as they are "generated", using chunked encoding
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, chunk in enumerate(chunks):
+                if i and self.server.faults.chunk_latency:
+                    time.sleep(self.server.faults.chunk_latency)
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream early (e.g. once the SQL block was complete)
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class MockServer(ThreadingHTTPServer):
+    """
+    Local OpenAI-compatible HTTP server backed by a MockModel.
+
+    Serves `POST .../chat/completions`, streaming and non-streaming, with one
+    thread per connection. Point the pipeline at `base_url`.
+
+    Args:
+        model: MockModel answering the requests
+        faults: FaultProfile with the latency distribution and injected errors
+        host: Interface to bind
+        port: Port to bind (0 picks a free one)
+        verbose: Log every request to stderr
+    """
+    daemon_threads = True
+
+    def __init__(self, model: MockModel, faults: FaultProfile = None, host: str = "127.0.0.1", port: int = 8000,
+                 verbose: bool = False):
+        super().__init__((host, port), _MockRequestHandler)
+        self.model = model
+        self.faults = faults or FaultProfile()
+        self.verbose = verbose
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
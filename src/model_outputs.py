@@ -1,67 +1,152 @@
+from datetime import datetime
 from pathlib import Path
 from openpyxl import Workbook
+from src.telemetry import Telemetry, STAGES, TELEMETRY_HEADER
+
+SUMMARY_HEADER = ["Model Name", "Prompt Type", "Avg SQL Match Score", "Avg Answer Match Score"]
+DETAIL_HEADER = [
+    "Test Type", "Model Name", "Prompt Type", "Case", "Question", "Generated SQL",
+    "Syntax OK", "Error Category", "SQL Match Score", "Answer Match Score", "Budget Exceeded", "Rows Read",
+    "Truncated", "Samples", "Votes", "Sample Tokens", "Sample Latency (s)", "Vote Latency (s)",
+    "Prompt Build (s)", "Queue Wait (s)", "TTFT (s)", "Generation (s)", "Extraction (s)", "Execution (s)",
+    "Scoring (s)", "Prompt Tokens", "Completion Tokens", "Tokens/s"
+]
+
+# Sheet title for each test type that gets its own summary sheet
+TEST_TYPE_SHEETS = {"original": "Original Test Cases", "custom": "Custom Test Cases"}
+
+
+class ResultsWriter:
+    """
+    Streaming Excel export of evaluation results.
+
+    Uses openpyxl's write-only mode: per-case rows go to the "Details" sheet as
+    they arrive, while only running sums are kept in memory for the summary
+    sheets, which are written by `close`. Stage timings are kept for the
+    per-model and per-prompt percentiles of the "Telemetry" sheet.
+
+    Args:
+        file_identifier: Name identifier for the file
+        output_folder: Directory for the timestamped output file
+    """
+
+    def __init__(self, file_identifier: str = "all_models", output_folder: str = "model_output"):
+        self.output_folder = Path(output_folder)
+        self.output_folder.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.output_file = self.output_folder / f"text_to_sql_{file_identifier}_results_{timestamp}.xlsx"
+
+        self.wb = Workbook(write_only=True)
+        # Summary sheets are created first so they come first in the file; rows are added on close
+        self.summary_sheet = self.wb.create_sheet("Summary")
+        self.test_type_sheets = {test_type: self.wb.create_sheet(title) for test_type, title in TEST_TYPE_SHEETS.items()}
+        self.detail_sheet = self.wb.create_sheet("Details")
+        self.detail_sheet.append(DETAIL_HEADER)
+        self.detail_rows = 0
+        self.telemetry_sheet = self.wb.create_sheet("Telemetry")
+        self.telemetry = Telemetry()
+
+        # (test_type, model_key, prompt_name) -> [sql_match_sum, answer_match_sum, count]
+        self.totals = {}
+
+    def add_result(self, record: dict):
+        """
+        Write one per-case result and fold it into the aggregates.
+
+        Args:
+            record: Journal-style dict with test_type, model, prompt, case, question,
+                    generated_sql, syntax_ok, sql_match, answer_match and optional
+                    error_category, budget_exceeded, rows_read, truncated, self-consistency fields
+                    (samples, votes, sample_tokens, sample_latency, vote_latency) and telemetry
+                    (timings per stage, prompt_tokens, completion_tokens, tokens_per_second)
+        """
+        timings = record.get("timings") or {}
+        self.detail_sheet.append([
+            record["test_type"], record["model"], record["prompt"], record["case"],
+            record.get("question"), record.get("generated_sql"), record.get("syntax_ok"),
+            record.get("error_category"), record["sql_match"], record["answer_match"], record.get("budget_exceeded"),
+            record.get("rows_read"), record.get("truncated"), record.get("samples"),
+            "/".join(map(str, record["votes"])) if record.get("votes") is not None else None,
+            record.get("sample_tokens"), record.get("sample_latency"), record.get("vote_latency"),
+            *[timings.get(stage) for stage in STAGES],
+            record.get("prompt_tokens"), record.get("completion_tokens"), record.get("tokens_per_second")
+        ])
+        self.detail_rows += 1
+        self.telemetry.add(record)
+        self.add_scores(record["test_type"], record["model"], record["prompt"],
+                        record["sql_match"], record["answer_match"])
+
+    def add_scores(self, test_type: str, model_key: str, prompt_name: str, sql_match: float, answer_match: float):
+        """Fold one result into the aggregates without writing a detail row."""
+        totals = self.totals.setdefault((test_type, model_key, prompt_name), [0.0, 0.0, 0])
+        totals[0] += sql_match
+        totals[1] += answer_match
+        totals[2] += 1
+
+    def close(self) -> Path:
+        """Write the summary sheets (computed in one pass over the totals) and save the file."""
+        combined = {}
+        per_test_type = {test_type: [] for test_type in self.test_type_sheets}
+        for (test_type, model_key, prompt_name), (sql_sum, answer_sum, count) in self.totals.items():
+            entry = combined.setdefault((model_key, prompt_name), [0.0, 0.0, 0])
+            entry[0] += sql_sum
+            entry[1] += answer_sum
+            entry[2] += count
+            if test_type in per_test_type:
+                per_test_type[test_type].append([model_key, prompt_name, sql_sum / count, answer_sum / count])
+
+        self.summary_sheet.append(SUMMARY_HEADER)
+        for (model_key, prompt_name), (sql_sum, answer_sum, count) in combined.items():
+            self.summary_sheet.append([model_key, prompt_name, sql_sum / count, answer_sum / count])
+
+        for test_type, rows in per_test_type.items():
+            sheet = self.test_type_sheets[test_type]
+            sheet.append(SUMMARY_HEADER)
+            for row in rows:
+                sheet.append(row)
+
+        telemetry_rows = self.telemetry.table()
+        self.telemetry_sheet.append(TELEMETRY_HEADER)
+        for row in telemetry_rows:
+            self.telemetry_sheet.append(row)
+
+        self.wb.save(self.output_file)
+        print(f"\nResults saved to: {self.output_file}")
+        print("  - Summary sheet: All test cases")
+        for test_type, rows in per_test_type.items():
+            if rows:
+                print(f"  - {TEST_TYPE_SHEETS[test_type]} sheet: {len(rows)} model-prompt combinations")
+        if self.detail_rows:
+            print(f"  - Details sheet: {self.detail_rows} results")
+        if telemetry_rows:
+            print("  - Telemetry sheet: p50/p95/p99 per model and per prompt")
+        return self.output_file
 
 
 def save_results_to_excel(prompt_results, model_name, original_results=None, custom_results=None):
     """
     Save evaluation results to Excel file with summary statistics.
-    
+
     Args:
         prompt_results: Dictionary mapping keys (model_key_prompt_name) to lists of results
                        Each result dict has 'sql_match' and 'answer_match'
         model_name: Name identifier for the file
         original_results: Optional dictionary for original test case results
         custom_results: Optional dictionary for custom test case results
+
+    Returns:
+        Path of the saved file
     """
-    # Create output folder
-    output_folder = Path("model_output")
-    output_folder.mkdir(exist_ok=True)
-    
-    # Create Excel workbook
-    wb = Workbook()
-    
-    # Summary sheet (all test cases combined)
-    summary_sheet = wb.active
-    summary_sheet.title = "Summary"
-    summary_sheet.append(["Model Name", "Prompt Type", "Avg SQL Match Score", "Avg Answer Match Score"])
-    
-    for key, results in prompt_results.items():
-        if results:
+    writer = ResultsWriter(model_name)
+    if original_results or custom_results:
+        by_test_type = {"original": original_results or {}, "custom": custom_results or {}}
+    else:
+        by_test_type = {"all": prompt_results}
+
+    for test_type, results_by_key in by_test_type.items():
+        for key, results in results_by_key.items():
             model_key, prompt_name = key.split("__", 1)
-            avg_sql_match = sum(r['sql_match'] for r in results) / len(results)
-            avg_answer_match = sum(r['answer_match'] for r in results) / len(results)
-            summary_sheet.append([model_key, prompt_name, avg_sql_match, avg_answer_match])
-    
-    # Original test cases sheet
-    if original_results:
-        original_sheet = wb.create_sheet("Original Test Cases")
-        original_sheet.append(["Model Name", "Prompt Type", "Avg SQL Match Score", "Avg Answer Match Score"])
-        
-        for key, results in original_results.items():
-            if results:
-                model_key, prompt_name = key.split("__", 1)
-                avg_sql_match = sum(r['sql_match'] for r in results) / len(results)
-                avg_answer_match = sum(r['answer_match'] for r in results) / len(results)
-                original_sheet.append([model_key, prompt_name, avg_sql_match, avg_answer_match])
-    
-    # Custom test cases sheet
-    if custom_results:
-        custom_sheet = wb.create_sheet("Custom Test Cases")
-        custom_sheet.append(["Model Name", "Prompt Type", "Avg SQL Match Score", "Avg Answer Match Score"])
-        
-        for key, results in custom_results.items():
-            if results:
-                model_key, prompt_name = key.split("__", 1)
-                avg_sql_match = sum(r['sql_match'] for r in results) / len(results)
-                avg_answer_match = sum(r['answer_match'] for r in results) / len(results)
-                custom_sheet.append([model_key, prompt_name, avg_sql_match, avg_answer_match])
-    
-    # Save file
-    output_file = output_folder / f"text_to_sql_model_results.xlsx"
-    wb.save(output_file)
-    print(f"\nResults saved to: {output_file}")
-    if original_results:
-        print(f"  - Summary sheet: All test cases")
-        print(f"  - Original Test Cases sheet: {len([r for r in original_results.values() if r])} model-prompt combinations")
-    if custom_results:
-        print(f"  - Custom Test Cases sheet: {len([r for r in custom_results.values() if r])} model-prompt combinations")
+            for r in results:
+                writer.add_scores(test_type, model_key, prompt_name, r['sql_match'], r['answer_match'])
+
+    return writer.close()
@@ -0,0 +1,122 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from src.db_pool import get_pool
+from src.sql_response import AnswerStream, get_query_budget, set_query_budget
+from src.sql_evaluator import evaluate_answer_stream, expected_row_counts
+from src.self_consistency import vote
+
+# Database used by this worker process (set by the pool initializer)
+_worker_db_path = "Chinook.db"
+
+
+def _init_worker(db_path: str, budget: dict):
+    """Open the worker's own read-only DB handle and apply the parent's query budget."""
+    global _worker_db_path
+    _worker_db_path = db_path
+    set_query_budget(**budget)
+    # One connection per worker: the pool's processes already use every core, so
+    # self-consistency candidates run one after another within a worker
+    get_pool(db_path, size=1)
+
+
+def _evaluate_sql(sql, expected_sql, expected_result, db_path: str, expected_counts=None):
+    """
+    Execute and score one generated SQL.
+    
+    A list of candidates (self-consistency sampling) is first reduced to the
+    majority-result candidate, and the vote is added to the evaluation. The
+    winner is scored from the result read while voting, not executed again.
+    
+    The evaluation also gets 'execution_time' (running the query and fetching
+    its rows) and 'scoring_time' (answer and SQL matching), in seconds.
+    """
+    voted = None
+    stream, row_counts = None, None
+    if isinstance(sql, list):
+        voted = vote(sql, db_path)
+        sql = voted['selected_sql']
+        stream, row_counts = voted.pop('selected_stream'), voted.pop('selected_rows')
+    if stream is None:
+        stream, row_counts = AnswerStream(sql, db_path), None
+    executed = stream.execution_time
+    start = time.perf_counter()
+    evaluation = evaluate_answer_stream(
+        stream,
+        generated_sql=sql,
+        expected_sql=expected_sql,
+        expected_result=expected_result,
+        row_counts=row_counts,
+        expected_counts=expected_counts
+    )
+    evaluation['execution_time'] = stream.execution_time
+    evaluation['scoring_time'] = time.perf_counter() - start - (stream.execution_time - executed)
+    if voted:
+        evaluation.update(voted)
+    return evaluation
+
+
+def _evaluate_case(case, db_path: str = None):
+    """Execute and score every generated SQL (or candidate list) for one test case."""
+    expected_sql, expected_result, generated_sqls = case
+    # Canonicalised once per case, for all of its generated queries
+    expected_counts = expected_row_counts(expected_result) if expected_result else None
+    return [
+        _evaluate_sql(sql, expected_sql, expected_result, db_path or _worker_db_path, expected_counts)
+        for sql in generated_sqls
+    ]
+
+
+def create_evaluation_pool(db_path: str = "Chinook.db", max_workers: int = None) -> ProcessPoolExecutor:
+    """
+    Create a process pool whose workers each hold their own read-only DB connection.
+    
+    Args:
+        db_path: Path to the SQLite database
+        max_workers: Number of worker processes (defaults to the CPU count)
+        
+    Returns:
+        ProcessPoolExecutor to pass to `evaluate_cases`
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers or os.cpu_count(),
+        initializer=_init_worker,
+        initargs=(db_path, get_query_budget()),
+    )
+
+
+def iter_evaluate_cases(cases: list, executor: ProcessPoolExecutor = None, db_path: str = "Chinook.db"):
+    """
+    Execute and score generated SQL for many test cases, in parallel if given a pool.
+    
+    Work is sent per test case, so each worker canonicalises a gold result
+    once for all of that case's generated queries. Results are yielded in
+    submission order as soon as they are available.
+    
+    Args:
+        cases: List of (expected_sql, expected_result, [generated_sql, ...]) tuples;
+               a generated_sql may be a list of sampled candidates to vote on
+        executor: Pool from `create_evaluation_pool`, or None to run in this process
+        db_path: Path to the SQLite database (in-process runs only)
+        
+    Yields:
+        List of `evaluate_answer_stream` results for each case
+    """
+    if executor is None:
+        for case in cases:
+            yield _evaluate_case(case, db_path)
+        return
+    # About four chunks per worker of this pool (which may be smaller than the CPU count)
+    workers = getattr(executor, "_max_workers", None) or os.cpu_count() or 1
+    chunksize = max(1, len(cases) // (workers * 4))
+    yield from executor.map(_evaluate_case, cases, chunksize=chunksize)
+
+
+def evaluate_cases(cases: list, executor: ProcessPoolExecutor = None, db_path: str = "Chinook.db"):
+    """
+    List form of `iter_evaluate_cases`.
+    
+    Returns:
+        List of lists of `evaluate_answer_stream` results, in submission order
+    """
+    return list(iter_evaluate_cases(cases, executor, db_path))
@@ -1,30 +1,92 @@
-def basic_prompt(schema_text: str, question: str) -> str:
-    """
-    Create a basic prompt for converting natural language question to SQL.
-    
-    Args:
-        schema_text: Database schema as formatted text
-        question: Natural language question
-        
-    Returns:
-        Formatted prompt string
-    """
-    prompt = f"Database schema:\n{schema_text}\n\nQuestion: {question}\n\nConvert to SQL. Make sure the syntax is correct:"
-    return prompt
+import re
+from functools import lru_cache
 
+# tiktoken's cl100k_base encoding, loaded on first use: None until tried, False if unavailable
+_encoding = None
 
-def few_shot_prompt(schema_text: str, question: str) -> str:
+# Rough tokenizer used when tiktoken is unavailable: words and individual punctuation
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# Placeholders in prompt templates, e.g. {schema_text}
+_FIELD_RE = re.compile(r"\{(\w+)\}")
+
+
+def _get_encoding():
+    """Load the cl100k_base encoding once; None if tiktoken is missing or the encoding can't be loaded."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # Not installed, or the encoding file can't be downloaded (e.g. offline)
+            _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken's cl100k_base encoding, or approximate them if it is unavailable."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(_TOKEN_RE.findall(text))
+
+
+class PromptTemplate:
     """
-    Create a few-shot prompt with examples for converting natural language to SQL.
-    
+    Prompt split into a static prefix and a per-question suffix.
+
+    Everything that is the same for every question (instructions, schema,
+    examples, output format) lives in the prefix, so providers with prompt
+    caching can reuse it across questions. Both templates are compiled once
+    into literal/field segments, and the rendered prefixes of the most recently
+    used schemas are cached (per-question schema retrieval makes many distinct
+    schema texts). Placeholders are substituted literally, so values may
+    contain braces.
+
     Args:
-        schema_text: Database schema as formatted text
-        question: Natural language question
-        
-    Returns:
-        Formatted prompt string with examples
+        static_template: Prefix template; may only use {schema_text}
+        dynamic_template: Suffix template with the per-question fields
+        prefix_cache_size: Rendered prefixes kept
     """
-    examples = """
+
+    def __init__(self, static_template: str, dynamic_template: str, prefix_cache_size: int = 64):
+        self._static = self._compile(static_template)
+        self._dynamic = self._compile(dynamic_template)
+        self._prefix = lru_cache(maxsize=prefix_cache_size)(self._render_prefix)
+
+    @staticmethod
+    def _compile(template: str) -> list:
+        """Split a template into alternating literal text and field names (odd positions)."""
+        return _FIELD_RE.split(template)
+
+    @staticmethod
+    def _render(segments: list, values: dict) -> str:
+        return "".join(values[part] if i % 2 else part for i, part in enumerate(segments))
+
+    def _render_prefix(self, schema_text: str) -> str:
+        return self._render(self._static, {"schema_text": schema_text})
+
+    def prefix(self, schema_text: str) -> str:
+        """Static part of the prompt, rendered once per (recently used) schema."""
+        return self._prefix(schema_text)
+
+    def suffix(self, **values) -> str:
+        """Per-question part of the prompt."""
+        return self._render(self._dynamic, values)
+
+    def render(self, schema_text: str, **values) -> str:
+        return self.prefix(schema_text) + self.suffix(**values)
+
+    def token_counts(self, schema_text: str, **values) -> dict:
+        """Token counts of the static prefix and the per-question suffix."""
+        return {
+            "static_tokens": count_tokens(self.prefix(schema_text)),
+            "dynamic_tokens": count_tokens(self.suffix(**values)),
+        }
+
+
+FEW_SHOT_EXAMPLES = """
 Example 1:
 Question: How many customers does each country have?
 SQL: SELECT Country, COUNT(*) as CustomerCount FROM Customer GROUP BY Country ORDER BY CustomerCount DESC
@@ -37,22 +99,37 @@ Example 3:
 Question: List all albums by the artist 'AC/DC'
 SQL: SELECT al.Title FROM Album al JOIN Artist ar ON al.ArtistId = ar.ArtistId WHERE ar.Name = 'AC/DC'
 """
-    
-    prompt = f"""
+
+_AGENTIC_STEPS = """1. What tables and columns are needed?
+2. What joins are required?
+3. What filters or aggregations are needed?
+4. Verify table and column names match the schema exactly."""
+
+_BATCH_OUTPUT_FORMAT = """Output one SQL query per question, each inside `<sql_query id="N">` tags
+where N is the id of the question it answers:
+
+<sql_query id="1">
+[Your SQL query for question 1 here]
+</sql_query>"""
+
+
+BASIC_TEMPLATE = PromptTemplate(
+    "Database schema:\n{schema_text}\n\nConvert the question to SQL. Make sure the syntax is correct.\n\n",
+    "Question: {question}\n\nSQL:"
+)
+
+FEW_SHOT_TEMPLATE = PromptTemplate(
+    """
 You are an AI assistant that converts natural language questions into SQL queries.
 You will be given a database schema and a question. Your task is to generate a correct SQL query that answers the question using the provided schema.
 
-<schema>  
-{schema_text}  
+<schema>
+{schema_text}
 </schema>
 
-<question>  
-{question}
-</question>
-
 Here are a few examples of how to convert natural language questions to SQL queries:
 <examples>
-{examples}
+""" + FEW_SHOT_EXAMPLES + """
 </examples>
 
 Keep in mind the following:
@@ -64,45 +141,215 @@ Keep in mind the following:
 <sql_query>
 [Your SQL query here]
 </sql_query>
+
+""",
+    """<question>
+{question}
+</question>
+"""
+)
+
+AGENTIC_TEMPLATE = PromptTemplate(
+    """
+You are an AI SQL assistant. Think through the problem step-by-step, then generate the SQL query.
+
+<schema>
+{schema_text}
+</schema>
+
+Before generating SQL, think about:
+""" + _AGENTIC_STEPS + """
+
+After thinking, output ONLY the SQL query inside <sql_query> tags. Do not include any explanation or reasoning text.
+
+<sql_query>
+[Your SQL query here]
+</sql_query>
+
+""",
+    """<question>
+{question}
+</question>
+"""
+)
+
+BASIC_BATCH_TEMPLATE = PromptTemplate(
+    "Database schema:\n{schema_text}\n\nConvert each question to SQL. Make sure the syntax is correct.\n"
+    + _BATCH_OUTPUT_FORMAT + "\n\n",
+    "Questions ({count}):\n{questions}\n"
+)
+
+FEW_SHOT_BATCH_TEMPLATE = PromptTemplate(
+    """
+You are an AI assistant that converts natural language questions into SQL queries.
+You will be given a database schema and several questions. Your task is to generate a correct SQL query for each question using the provided schema.
+
+<schema>
+{schema_text}
+</schema>
+
+Here are a few examples of how to convert natural language questions to SQL queries:
+<examples>
+""" + FEW_SHOT_EXAMPLES + """
+</examples>
+
+Keep in mind the following:
+- Use the examples to help you convert the natural language questions to SQL.
+- Use the schema to help you convert the natural language questions to SQL.
+
+""" + _BATCH_OUTPUT_FORMAT + "\n\n",
+    """<questions count="{count}">
+{questions}
+</questions>
+"""
+)
+
+AGENTIC_BATCH_TEMPLATE = PromptTemplate(
+    """
+You are an AI SQL assistant. Think through each problem step-by-step, then generate the SQL queries.
+
+<schema>
+{schema_text}
+</schema>
+
+Before generating SQL for each question, think about:
+""" + _AGENTIC_STEPS + """
+
+After thinking, output ONLY the SQL queries inside their tags. Do not include any explanation or reasoning text.
+
+""" + _BATCH_OUTPUT_FORMAT + "\n\n",
+    """<questions count="{count}">
+{questions}
+</questions>
 """
-    
-    return prompt
+)
+
+
+def basic_prompt(schema_text: str, question: str) -> str:
+    """
+    Create a basic prompt for converting natural language question to SQL.
+
+    Args:
+        schema_text: Database schema as formatted text
+        question: Natural language question
+
+    Returns:
+        Formatted prompt string
+    """
+    return BASIC_TEMPLATE.render(schema_text, question=question)
+
+
+def few_shot_prompt(schema_text: str, question: str) -> str:
+    """
+    Create a few-shot prompt with examples for converting natural language to SQL.
+
+    Args:
+        schema_text: Database schema as formatted text
+        question: Natural language question
+
+    Returns:
+        Formatted prompt string with examples
+    """
+    return FEW_SHOT_TEMPLATE.render(schema_text, question=question)
 
 
 def agentic_prompt(schema_text: str, question: str) -> str:
     """
     Create an agentic prompt that demonstrates iterative reasoning and self-correction.
     Simplified to focus on SQL output while showing agentic thinking.
-    
+
     Args:
         schema_text: Database schema as formatted text
         question: Natural language question
-        
+
     Returns:
         Formatted prompt string with agentic reasoning steps
     """
-    prompt = f"""
-You are an AI SQL assistant. Think through the problem step-by-step, then generate the SQL query.
+    return AGENTIC_TEMPLATE.render(schema_text, question=question)
 
-<schema>
-{schema_text}
-</schema>
 
-<question>
-{question}
-</question>
+def _format_questions(questions: list) -> str:
+    """Number questions as <question id="N"> blocks, starting at 1."""
+    return "\n".join(f'<question id="{i}">\n{question}\n</question>' for i, question in enumerate(questions, 1))
 
-Before generating SQL, think about:
-1. What tables and columns are needed?
-2. What joins are required?
-3. What filters or aggregations are needed?
-4. Verify table and column names match the schema exactly.
 
-After thinking, output ONLY the SQL query inside <sql_query> tags. Do not include any explanation or reasoning text.
+def basic_batch_prompt(schema_text: str, questions: list) -> str:
+    """
+    Batched variant of `basic_prompt`: several questions share one copy of the schema.
 
-<sql_query>
-[Your SQL query here]
-</sql_query>
-"""
-    return prompt
+    Args:
+        schema_text: Database schema as formatted text
+        questions: List of natural language questions
+
+    Returns:
+        Formatted prompt string
+    """
+    return BASIC_BATCH_TEMPLATE.render(schema_text, questions=_format_questions(questions), count=str(len(questions)))
+
+
+def few_shot_batch_prompt(schema_text: str, questions: list) -> str:
+    """
+    Batched variant of `few_shot_prompt`.
+
+    Args:
+        schema_text: Database schema as formatted text
+        questions: List of natural language questions
+
+    Returns:
+        Formatted prompt string with examples
+    """
+    return FEW_SHOT_BATCH_TEMPLATE.render(schema_text, questions=_format_questions(questions), count=str(len(questions)))
+
+
+def agentic_batch_prompt(schema_text: str, questions: list) -> str:
+    """
+    Batched variant of `agentic_prompt`.
+
+    Args:
+        schema_text: Database schema as formatted text
+        questions: List of natural language questions
+
+    Returns:
+        Formatted prompt string with agentic reasoning steps
+    """
+    return AGENTIC_BATCH_TEMPLATE.render(schema_text, questions=_format_questions(questions), count=str(len(questions)))
 
+
+# Batched counterpart of each single-question prompt
+BATCH_PROMPTS = {
+    basic_prompt: basic_batch_prompt,
+    few_shot_prompt: few_shot_batch_prompt,
+    agentic_prompt: agentic_batch_prompt,
+}
+
+# Template behind each single-question prompt, for token accounting
+PROMPT_TEMPLATES = {
+    basic_prompt: BASIC_TEMPLATE,
+    few_shot_prompt: FEW_SHOT_TEMPLATE,
+    agentic_prompt: AGENTIC_TEMPLATE,
+}
+
+
+def prompt_token_report(prompts: list, schema_text: str, questions: list) -> dict:
+    """
+    Static and per-question token counts for each prompt.
+
+    Args:
+        prompts: List of tuples (prompt_name, prompt_func)
+        schema_text: Database schema as formatted text
+        questions: Natural language questions to measure the dynamic part on
+
+    Returns:
+        Dictionary mapping prompt names to {'static_tokens', 'avg_dynamic_tokens'}
+    """
+    report = {}
+    for prompt_name, prompt_func in prompts:
+        template = PROMPT_TEMPLATES.get(prompt_func)
+        if template is None or not questions:
+            continue
+        dynamic = [count_tokens(template.suffix(question=q)) for q in questions]
+        report[prompt_name] = {
+            "static_tokens": count_tokens(template.prefix(schema_text)),
+            "avg_dynamic_tokens": sum(dynamic) / len(dynamic),
+        }
+    return report
@@ -0,0 +1,205 @@
+import asyncio
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket:
+    """
+    Token bucket that refills continuously at `rate_per_minute`.
+
+    Reservations may drive the bucket negative; the caller then waits until
+    the deficit has been refilled. This keeps reservations first-come,
+    first-served without a background thread.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate_per_second = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float, scale: float):
+        elapsed = now - self.updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate_per_second * scale)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float, scale: float = 1.0) -> float:
+        """Take `amount` tokens and return how many seconds to wait before using them."""
+        self._refill(now, scale)
+        # A single request larger than the bucket may still go through once it is full
+        amount = min(amount, self.capacity)
+        self.tokens -= amount
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / (self.rate_per_second * scale)
+
+    def refund(self, amount: float):
+        """Return unused tokens to the bucket (e.g. when usage was over-estimated)."""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self):
+        """Empty the bucket, e.g. when the provider reports no remaining quota."""
+        self.tokens = min(self.tokens, 0.0)
+
+
+def _parse_duration(value):
+    """Parse a rate-limit reset value such as '1s', '6m0s', '250ms' or '12.5' into seconds."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r'([\d.]+)\s*(ms|h|m|s)', value)
+    if not parts:
+        return None
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * units[unit] for number, unit in parts)
+
+
+def parse_retry_after(headers):
+    """
+    Extract the server-requested wait from response headers.
+
+    Args:
+        headers: Mapping of HTTP response headers (case-insensitive or lowercase)
+
+    Returns:
+        Seconds to wait, or None if the headers don't specify one
+    """
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms is not None:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if retry_after is None:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class RateLimiter:
+    """
+    Adaptive per-model limiter for requests per minute and tokens per minute.
+
+    Throughput starts at the configured limits. Every 429 halves the effective
+    rate and blocks until the server's `Retry-After`; every success raises it
+    again additively until the configured limits are reached.
+    """
+
+    MIN_SCALE = 0.1
+    DECREASE_FACTOR = 0.5
+    INCREASE_STEP = 0.05
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float = None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.scale = 1.0
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, estimated_tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = self.requests.reserve(1, now, self.scale)
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.reserve(estimated_tokens, now, self.scale))
+            return max(wait, self.blocked_until - now)
+
+    def acquire(self, estimated_tokens: int = 0):
+        """Block until a request costing `estimated_tokens` may be sent."""
+        wait = self._reserve(estimated_tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, estimated_tokens: int = 0):
+        """Async counterpart of `acquire`."""
+        wait = self._reserve(estimated_tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def _settle(self, estimated_tokens: int, actual_tokens: int = None):
+        if self.tokens is not None and actual_tokens is not None and actual_tokens < estimated_tokens:
+            self.tokens.refund(estimated_tokens - actual_tokens)
+
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        """Refund an over-estimated reservation once a streamed call's usage is known."""
+        with self._lock:
+            self._settle(estimated_tokens, actual_tokens)
+
+    def on_success(self, headers=None, estimated_tokens: int = 0, actual_tokens: int = None):
+        """Record a successful call and adapt to the provider's rate-limit headers."""
+        with self._lock:
+            self.scale = min(1.0, self.scale + self.INCREASE_STEP)
+            self._settle(estimated_tokens, actual_tokens)
+            if not headers:
+                return
+            now = time.monotonic()
+            for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if bucket is None or remaining is None:
+                    continue
+                try:
+                    remaining = float(remaining)
+                except ValueError:
+                    continue
+                if remaining <= 0:
+                    bucket.drain()
+                    reset = _parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                    if reset:
+                        self.blocked_until = max(self.blocked_until, now + reset)
+                else:
+                    bucket.tokens = min(bucket.tokens, remaining)
+
+    def on_rate_limited(self, retry_after: float = None, attempt: int = 0):
+        """
+        Record a 429 response: slow down and block until the server allows retries.
+
+        Returns:
+            Seconds the caller should wait before retrying
+        """
+        with self._lock:
+            self.scale = max(self.MIN_SCALE, self.scale * self.DECREASE_FACTOR)
+            if retry_after is None:
+                retry_after = min(60.0, 2.0 ** attempt)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            self.requests.drain()
+            return retry_after
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model_name: str, config: dict) -> RateLimiter:
+    """
+    Return the shared limiter for a model, creating it from `rate_limits` in models.yaml.
+
+    Args:
+        model_name: Model key from models.yaml
+        config: Parsed models.yaml
+
+    Returns:
+        RateLimiter shared by every call path for that model
+    """
+    with _limiters_lock:
+        if model_name not in _limiters:
+            limits = config.get("rate_limits", {})
+            model_limits = {**limits.get("default", {}), **limits.get(model_name, {})}
+            _limiters[model_name] = RateLimiter(
+                requests_per_minute=model_limits.get("requests_per_minute", 60),
+                tokens_per_minute=model_limits.get("tokens_per_minute"),
+            )
+        return _limiters[model_name]
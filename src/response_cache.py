@@ -0,0 +1,126 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# Request fields that determine the completion; everything else (timeouts, streaming) is ignored
+_KEY_FIELDS = ("model", "messages", "temperature", "max_tokens", "top_p", "presence_penalty", "frequency_penalty")
+# Fields that only enter the key when set, so existing entries keep their keys
+# ("sample" is not sent to the API; it separates repeated samples of one request)
+_OPTIONAL_KEY_FIELDS = ("stop", "n", "sample")
+
+_replay_mode = False
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class ReplayCacheMiss(LookupError):
+    """Raised in replay mode when a request is not in the response cache."""
+
+
+def set_replay_mode(enabled: bool):
+    """Serve completions only from the cache; cache misses raise `ReplayCacheMiss`."""
+    global _replay_mode
+    _replay_mode = enabled
+
+
+def is_replay_mode() -> bool:
+    return _replay_mode
+
+
+class ResponseCache:
+    """
+    Persistent, content-addressed store of LLM completions in a SQLite file.
+
+    Entries are keyed by a hash of the model id, the rendered messages and the
+    sampling parameters. When the stored text exceeds `max_bytes`, the least
+    recently used entries are evicted. The stored size is summed once when the
+    cache is opened and kept up to date on every insert, replace and eviction.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, content TEXT, size INTEGER, "
+            "created_at REAL, accessed_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(request_kwargs: dict) -> str:
+        """Hash the parts of a chat completion request that determine its output."""
+        payload = {field: request_kwargs.get(field) for field in _KEY_FIELDS}
+        payload.update({field: request_kwargs[field] for field in _OPTIONAL_KEY_FIELDS if field in request_kwargs})
+        encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, key: str):
+        """Return the cached completion text, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def put(self, key: str, model: str, content: str):
+        """Store a completion and evict least recently used entries if over the size limit."""
+        content = content or ""
+        size = len(content.encode())
+        now = time.time()
+        with self._lock:
+            replaced = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, content, size, now, now),
+            )
+            self._total += size - (replaced[0] if replaced else 0)
+            self._evict()
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        # Evict down to 90% of the limit so eviction doesn't run on every insert
+        target = self.max_bytes * 0.9
+        evicted = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if self._total <= target:
+                break
+            evicted.append((key,))
+            self._total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_response_cache(config: dict):
+    """
+    Return the shared response cache configured under `response_cache` in models.yaml.
+
+    Args:
+        config: Parsed models.yaml
+
+    Returns:
+        ResponseCache, or None if caching is disabled
+    """
+    options = config.get("response_cache", {})
+    if not options.get("enabled", False):
+        return None
+    path = options.get("path", ".cache/llm_responses.sqlite")
+    with _caches_lock:
+        if path not in _caches:
+            max_bytes = int(options.get("max_size_mb", 512) * 1024 * 1024)
+            _caches[path] = ResponseCache(path, max_bytes)
+        return _caches[path]
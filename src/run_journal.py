@@ -0,0 +1,127 @@
+import hashlib
+import json
+from pathlib import Path
+
+
+def case_key(test_case: dict) -> str:
+    """Stable identifier for a test case, derived from its question and gold SQL."""
+    digest = hashlib.sha1(f"{test_case['question']}\n{test_case['sql']}".encode()).hexdigest()
+    return digest[:16]
+
+
+def parse_shard(spec: str):
+    """
+    Parse a shard spec "i/N" (0-based shard i of N).
+
+    Returns:
+        Tuple of (index, count)
+
+    Raises:
+        ValueError: If the spec is malformed or the index is out of range
+    """
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, got {spec!r}") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be in 0..N-1, got {spec!r}")
+    return index, count
+
+
+def work_shard(model_key: str, prompt_name: str, case_id: str, count: int) -> int:
+    """
+    Shard (0..count-1) that owns a (model, prompt, case) triple.
+
+    Derived from a hash of the triple, so every worker computes the same
+    partition whatever order the test cases are read in.
+    """
+    digest = hashlib.sha1(f"{model_key}\n{prompt_name}\n{case_id}".encode()).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def read_journal(path: str):
+    """Yield the records of a journal file, skipping a truncated last line."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write can leave a truncated last line
+                continue
+
+
+class RunJournal:
+    """
+    Append-only JSONL journal of evaluation outcomes.
+    
+    Every (model, prompt, case) result is written and flushed as soon as it is
+    known, so an interrupted run can be resumed from the journal instead of
+    repeated from scratch. Failed requests are journaled with an 'error'
+    field; they don't count as completed, so a resumed run retries them.
+    
+    Only the keys of completed triples are held in memory; the records
+    themselves are read back from disk with `records()`.
+    
+    Args:
+        path: Journal file location
+        resume: Keep existing entries and load their keys; otherwise start a fresh journal
+        overwrite: Allow a fresh journal to replace a non-empty existing file
+        
+    Raises:
+        FileExistsError: If the journal exists and neither `resume` nor `overwrite` is set
+    """
+
+    def __init__(self, path: str, resume: bool = False, overwrite: bool = False):
+        self.path = Path(path)
+        if not (resume or overwrite) and self.path.exists() and self.path.stat().st_size:
+            raise FileExistsError(f"Journal {self.path} already exists; resume it or allow overwriting it")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.completed = set()
+        self.failed = 0
+        if resume and self.path.exists():
+            self._load()
+        mode = "a" if resume else "w"
+        self._file = open(self.path, mode, encoding="utf-8")
+
+    @staticmethod
+    def _key(test_type, model_key, prompt_name, case_id):
+        return (test_type, model_key, prompt_name, case_id)
+
+    def _load(self):
+        for record in read_journal(self.path):
+            if not record.get("error"):
+                self.completed.add(self._key(record["test_type"], record["model"], record["prompt"], record["case"]))
+
+    def is_completed(self, test_type: str, model_key: str, prompt_name: str, case_id: str) -> bool:
+        """Whether a triple has a journaled (non-failed) result."""
+        return self._key(test_type, model_key, prompt_name, case_id) in self.completed
+
+    def records(self):
+        """Stream the completed records from disk, once per triple (e.g. to rebuild aggregates on resume)."""
+        self._file.flush()
+        seen = set()
+        for record in read_journal(self.path):
+            if record.get("error"):
+                continue
+            key = self._key(record["test_type"], record["model"], record["prompt"], record["case"])
+            if key not in seen:
+                seen.add(key)
+                yield record
+
+    def append(self, record: dict):
+        """Write one outcome; `record` needs test_type, model, prompt and case fields (and 'error' if it failed)."""
+        if record.get("error"):
+            self.failed += 1
+        else:
+            self.completed.add(self._key(record["test_type"], record["model"], record["prompt"], record["case"]))
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from utils import load_db, get_schema
+
+# In-process cache: resolved db path -> (stat key, schema_version, schema_text)
+_schema_cache = {}
+_schema_lock = threading.Lock()
+
+
+def _stat_key(db_path: Path):
+    """File-level part of the fingerprint: size and modification time."""
+    stat = db_path.stat()
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def _schema_version(db_path: Path) -> int:
+    """Read SQLite's `PRAGMA schema_version`, which changes on every DDL statement."""
+    conn = sqlite3.connect(f"{db_path.as_uri()}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA schema_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def db_fingerprint(db_path: str = "Chinook.db") -> str:
+    """
+    Fingerprint a database by path, file size, mtime and schema version.
+
+    Args:
+        db_path: Path to the SQLite database
+
+    Returns:
+        Hex digest identifying the current state of the database
+    """
+    path = Path(db_path).resolve()
+    size, mtime_ns = _stat_key(path)
+    key = f"{path}|{size}|{mtime_ns}|{_schema_version(path)}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def format_schema(schema: dict) -> str:
+    """Format `utils.get_schema` output as one line per table."""
+    return "\n".join([f"{table}: {[c['name'] for c in cols]}" for table, cols in schema.items()])
+
+
+def _introspect(db_path: Path) -> str:
+    conn = load_db(str(db_path))
+    try:
+        return format_schema(get_schema(conn))
+    finally:
+        conn.close()
+
+
+def _disk_cache_dir(cache_dir):
+    cache_dir = cache_dir or os.getenv("SCHEMA_CACHE_DIR")
+    return Path(cache_dir) if cache_dir else None
+
+
+def get_schema_text(db_path: str = "Chinook.db", cache_dir: str = None) -> str:
+    """
+    Return the formatted schema text for a database, introspecting it at most once.
+
+    The cache is keyed by the resolved path plus file size, mtime and
+    `PRAGMA schema_version`. While size and mtime are unchanged the database
+    is not opened at all; if they change but the schema version does not
+    (data-only writes), the cached text is reused.
+
+    Args:
+        db_path: Path to the SQLite database
+        cache_dir: Optional directory for a persistent cache across processes
+                   (defaults to the SCHEMA_CACHE_DIR environment variable)
+
+    Returns:
+        Schema as text, one line per table
+    """
+    path = Path(db_path).resolve()
+    stat_key = _stat_key(path)
+
+    with _schema_lock:
+        cached = _schema_cache.get(path)
+        if cached and cached[0] == stat_key:
+            return cached[2]
+
+        version = _schema_version(path)
+        if cached and cached[1] == version:
+            _schema_cache[path] = (stat_key, version, cached[2])
+            return cached[2]
+
+        disk_dir = _disk_cache_dir(cache_dir)
+        disk_file = None
+        if disk_dir:
+            digest = hashlib.sha256(f"{path}|{stat_key[0]}|{stat_key[1]}|{version}".encode()).hexdigest()
+            disk_file = disk_dir / f"schema_{digest}.json"
+            if disk_file.exists():
+                schema_text = json.loads(disk_file.read_text())["schema_text"]
+                _schema_cache[path] = (stat_key, version, schema_text)
+                return schema_text
+
+        schema_text = _introspect(path)
+        _schema_cache[path] = (stat_key, version, schema_text)
+
+        if disk_file:
+            disk_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = disk_file.with_suffix(".tmp")
+            tmp_file.write_text(json.dumps({"db_path": str(path), "schema_version": version,
+                                            "schema_text": schema_text}))
+            tmp_file.replace(disk_file)
+
+        return schema_text
+
+
+def clear_schema_cache():
+    """Drop all in-process cached schemas."""
+    with _schema_lock:
+        _schema_cache.clear()
@@ -0,0 +1,197 @@
+import re
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from pathlib import Path
+import numpy as np
+from src.schema_cache import _schema_version, _stat_key
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Weight of neighbouring tables' names in a table's document (relative to its own terms)
+NEIGHBOUR_WEIGHT = 0.5
+
+_WORD_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+# Resolved db path -> (stat key, schema_version, SchemaIndex), most recently used last
+_MAX_INDEXES = 8
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def tokenize(text: str) -> list:
+    """Split text into lowercase terms, breaking camelCase/snake_case and dropping a plural 's'."""
+    terms = []
+    for word in _WORD_RE.findall(text):
+        word = word.lower()
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+class SchemaIndex:
+    """
+    BM25 index over a database's tables for selecting the schema relevant to a question.
+
+    Each table is a document made of its name, its column names and (down-weighted)
+    the names of the tables it shares a foreign key with. Selected tables are
+    completed with the tables on foreign-key join paths between them.
+
+    Args:
+        columns: Mapping of table name to list of column names, in schema order
+        foreign_keys: List of (table, column, referenced_table, referenced_column)
+    """
+
+    def __init__(self, columns: dict, foreign_keys: list):
+        self.tables = list(columns)
+        self.columns = columns
+        self.foreign_keys = foreign_keys
+
+        self.neighbours = {table: set() for table in self.tables}
+        for table, _, ref_table, _ in foreign_keys:
+            if table in self.neighbours and ref_table in self.neighbours and table != ref_table:
+                self.neighbours[table].add(ref_table)
+                self.neighbours[ref_table].add(table)
+
+        # Weighted term frequencies per table document
+        documents = []
+        for table in self.tables:
+            weights = {}
+            for term in tokenize(table) + [t for col in columns[table] for t in tokenize(col)]:
+                weights[term] = weights.get(term, 0.0) + 1.0
+            for neighbour in self.neighbours[table]:
+                for term in tokenize(neighbour):
+                    weights[term] = weights.get(term, 0.0) + NEIGHBOUR_WEIGHT
+            documents.append(weights)
+
+        self.vocabulary = {term: i for i, term in enumerate(sorted({t for doc in documents for t in doc}))}
+        tf = np.zeros((len(self.vocabulary), len(self.tables)))
+        for j, doc in enumerate(documents):
+            for term, weight in doc.items():
+                tf[self.vocabulary[term], j] = weight
+
+        doc_lengths = tf.sum(axis=0)
+        avg_length = doc_lengths.mean() if len(doc_lengths) else 1.0
+        doc_freq = (tf > 0).sum(axis=1)
+        idf = np.log(1 + (len(self.tables) - doc_freq + 0.5) / (doc_freq + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths / avg_length)
+        # Precomputed BM25 term weights: score(question) is a sum of rows of this matrix
+        self.term_weights = idf[:, None] * tf * (BM25_K1 + 1) / (tf + norm)
+
+    @classmethod
+    def from_db(cls, db_path: str = "Chinook.db") -> "SchemaIndex":
+        """Build an index by introspecting tables, columns and foreign keys of a SQLite database."""
+        conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            tables = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+            )]
+            columns = {}
+            foreign_keys = []
+            for table in tables:
+                quoted = table.replace('"', '""')
+                columns[table] = [row[1] for row in conn.execute(f'PRAGMA table_info("{quoted}")')]
+                for row in conn.execute(f'PRAGMA foreign_key_list("{quoted}")'):
+                    foreign_keys.append((table, row[3], row[2], row[4]))
+        finally:
+            conn.close()
+        return cls(columns, foreign_keys)
+
+    def scores(self, question: str) -> np.ndarray:
+        """BM25 score of every table for a question."""
+        rows = [self.vocabulary[term] for term in tokenize(question) if term in self.vocabulary]
+        if not rows:
+            return np.zeros(len(self.tables))
+        return self.term_weights[rows].sum(axis=0)
+
+    def _join_path(self, start: str, goals: set) -> list:
+        """Shortest foreign-key path from `start` to any table in `goals` (BFS)."""
+        previous = {start: None}
+        queue = deque([start])
+        while queue:
+            table = queue.popleft()
+            if table in goals:
+                path = []
+                while table is not None:
+                    path.append(table)
+                    table = previous[table]
+                return path
+            for neighbour in self.neighbours[table]:
+                if neighbour not in previous:
+                    previous[neighbour] = table
+                    queue.append(neighbour)
+        return []
+
+    def select_tables(self, question: str, top_k: int = 5) -> list:
+        """
+        Pick the `top_k` most relevant tables plus the tables needed to join them.
+
+        Args:
+            question: Natural language question
+            top_k: Number of tables chosen by relevance score
+
+        Returns:
+            Table names in schema order
+        """
+        scores = self.scores(question)
+        ranked = [j for j in np.argsort(-scores, kind="stable") if scores[j] > 0][:top_k]
+        if not ranked:
+            # Nothing matched lexically; fall back to the full schema
+            return list(self.tables)
+
+        selected = {self.tables[ranked[0]]}
+        for j in ranked[1:]:
+            table = self.tables[j]
+            if table not in selected:
+                selected.update(self._join_path(table, selected) or [table])
+        return [table for table in self.tables if table in selected]
+
+    def schema_text(self, tables: list) -> str:
+        """Format the given tables like `schema_cache.format_schema`."""
+        return "\n".join(f"{table}: {self.columns[table]}" for table in tables)
+
+
+def get_schema_index(db_path: str = "Chinook.db") -> SchemaIndex:
+    """
+    Return the index for a database, rebuilt only when its schema changes.
+
+    As with `get_schema_text`, the database is not opened while its size and
+    mtime are unchanged. One index is kept per database, for the
+    `_MAX_INDEXES` most recently used databases.
+    """
+    path = Path(db_path).resolve()
+    stat_key = _stat_key(path)
+    with _indexes_lock:
+        cached = _indexes.get(path)
+        if cached and cached[0] == stat_key:
+            _indexes.move_to_end(path)
+            return cached[2]
+        version = _schema_version(path)
+        index = cached[2] if cached and cached[1] == version else SchemaIndex.from_db(str(path))
+        _indexes[path] = (stat_key, version, index)
+        _indexes.move_to_end(path)
+        if len(_indexes) > _MAX_INDEXES:
+            _indexes.popitem(last=False)
+        return index
+
+
+def relevant_schema_text(questions: list, db_path: str = "Chinook.db", top_k: int = 5) -> str:
+    """
+    Schema text restricted to the tables relevant to the given questions.
+
+    Args:
+        questions: Natural language questions; the union of their tables is used
+        db_path: Path to the SQLite database
+        top_k: Number of tables chosen by relevance score per question
+
+    Returns:
+        Schema as text, one line per selected table
+    """
+    index = get_schema_index(db_path)
+    selected = set()
+    for question in questions:
+        selected.update(index.select_tables(question, top_k))
+    return index.schema_text([table for table in index.tables if table in selected])
@@ -0,0 +1,99 @@
+import hashlib
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from src.db_pool import get_pool
+from src.sql_response import AnswerStream
+from src.sql_evaluator import normalize_row_values
+
+
+def _execute_candidate(sql: str, db_path: str):
+    """
+    Execute a candidate, reading its result as a multiset of canonical rows.
+
+    Returns:
+        Tuple of (fingerprint or None if it failed, consumed AnswerStream or None
+        for empty SQL, Counter of canonical rows)
+    """
+    rows = Counter()
+    if not sql:
+        return None, None, rows
+    stream = AnswerStream(sql, db_path)
+    for batch in stream:
+        rows.update(normalize_row_values(row) for row in batch)
+    if stream.error is not None:
+        return None, stream, rows
+    encoded = repr((sorted(rows.items()), stream.truncated)).encode()
+    return hashlib.sha1(encoded).hexdigest(), stream, rows
+
+
+def result_fingerprint(sql: str, db_path: str = "Chinook.db"):
+    """
+    Execute a candidate and fingerprint its result as a multiset of canonical rows.
+
+    Rows are compared the same way as in answer matching (column names and
+    order ignored, floats rounded), so candidates that differ only in aliases
+    or row order share a fingerprint.
+
+    Args:
+        sql: Candidate SQL query
+        db_path: Path to the SQLite database
+
+    Returns:
+        Hex digest of the result, or None if the query failed or ran out of budget
+    """
+    return _execute_candidate(sql, db_path)[0]
+
+
+def vote(candidates: list, db_path: str = "Chinook.db") -> dict:
+    """
+    Pick the candidate whose execution result most candidates agree on.
+
+    Candidates run in parallel on as many threads as the database's read-only
+    pool has connections (evaluation pool workers open a one-connection pool,
+    so there they run one after another and parallelism comes from the worker
+    processes). Failed candidates get no vote; ties go to the result produced
+    first in sampling order.
+
+    The selected candidate's consumed AnswerStream and canonical rows are
+    returned too, so it can be scored without executing it again (see
+    `evaluate_answer_stream`'s `row_counts`).
+
+    Args:
+        candidates: Candidate SQL queries for one question
+        db_path: Path to the SQLite database
+
+    Returns:
+        Dictionary with: {'selected_sql': str, 'votes': list of group sizes (largest first),
+                          'samples': int, 'failed': int, 'vote_latency': float,
+                          'selected_stream': AnswerStream or None (no non-empty candidate),
+                          'selected_rows': Counter}
+    """
+    start = time.perf_counter()
+    workers = max(1, min(len(candidates), get_pool(db_path).size))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        executions = list(executor.map(lambda sql: _execute_candidate(sql, db_path), candidates))
+
+    # fingerprint -> candidate indices, in order of first appearance
+    groups = {}
+    for i, (fingerprint, _, _) in enumerate(executions):
+        if fingerprint is not None:
+            groups.setdefault(fingerprint, []).append(i)
+
+    if groups:
+        selected = max(groups.values(), key=len)[0]
+    else:
+        # Nothing executed; keep the first non-empty candidate so the failure is still scored
+        selected = next((i for i, sql in enumerate(candidates) if sql), None)
+    _, stream, rows = executions[selected] if selected is not None else (None, None, Counter())
+
+    votes = sorted((len(indices) for indices in groups.values()), reverse=True)
+    return {
+        'selected_sql': candidates[selected] if selected is not None else "",
+        'votes': votes,
+        'samples': len(candidates),
+        'failed': len(candidates) - sum(votes),
+        'vote_latency': time.perf_counter() - start,
+        'selected_stream': stream,
+        'selected_rows': rows
+    }
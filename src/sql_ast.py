@@ -0,0 +1,463 @@
+import re
+from collections import Counter
+
+# Clauses a query is split into for structural comparison
+COMPONENTS = ("select", "tables", "joins", "where", "group_by", "having", "order_by", "limit", "compound")
+
+_TOKEN_RE = re.compile(r"""
+    (?P<space>\s+|--[^\n]*|/\*.*?\*/)
+  | (?P<str>'(?:[^']|'')*')
+  | (?P<ident>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+  | (?P<num>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+  | (?P<op><=|>=|<>|!=|==|\|\||<<|>>|[-+*/%<>=(),.;~&|?:@$])
+""", re.X | re.S)
+
+# Words that are never column references
+_KEYWORDS = {
+    "select", "distinct", "all", "from", "where", "group", "by", "having", "order", "limit", "offset",
+    "as", "and", "or", "not", "in", "is", "null", "like", "glob", "regexp", "match", "between", "exists",
+    "case", "when", "then", "else", "end", "cast", "collate", "escape", "asc", "desc", "nulls", "first",
+    "last", "join", "inner", "left", "right", "full", "outer", "cross", "natural", "on", "using",
+    "union", "intersect", "except", "with", "recursive", "over", "partition", "filter", "window",
+    "true", "false", "current_date", "current_time", "current_timestamp",
+}
+_JOIN_WORDS = {"join", "inner", "left", "right", "full", "outer", "cross", "natural"}
+_CLAUSES = ("from", "where", "group", "having", "order", "limit", "offset", "window")
+_COMPOUND = {"union", "intersect", "except"}
+# Comparisons rewritten so that equivalent predicates compare equal ("a > b" == "b < a")
+_SYMMETRIC = {"=", "==", "!=", "<>"}
+_FLIPPED = {">": "<", ">=": "<="}
+
+
+class SqlParseError(ValueError):
+    """Raised when a query is outside the subset of SQL the structural parser understands."""
+
+
+def _tokenize(sql: str) -> list:
+    """Split SQL into (kind, text) tokens; words and quoted identifiers are lowercased."""
+    tokens = []
+    pos = 0
+    while pos < len(sql):
+        m = _TOKEN_RE.match(sql, pos)
+        if m is None:
+            raise SqlParseError(f"Unexpected character {sql[pos]!r} at position {pos}")
+        pos = m.end()
+        kind = m.lastgroup
+        text = m.group()
+        if kind == "space":
+            continue
+        if kind == "ident":
+            # Quoted identifiers are never keywords; SQLite names are case-insensitive
+            kind, text = "name", text[1:-1].replace('""', '"').lower()
+        elif kind == "word":
+            text = text.lower()
+        tokens.append((kind, text))
+    return tokens
+
+
+def _matching_paren(tokens: list, start: int) -> int:
+    """Index of the ')' closing the '(' at `start`."""
+    depth = 0
+    for i in range(start, len(tokens)):
+        if tokens[i] == ("op", "("):
+            depth += 1
+        elif tokens[i] == ("op", ")"):
+            depth -= 1
+            if depth == 0:
+                return i
+    raise SqlParseError("Unbalanced parentheses")
+
+
+def _split_top(tokens: list, is_separator) -> list:
+    """Split tokens at depth-0 positions where `is_separator(tokens, i)` is true."""
+    parts, current, depth = [], [], 0
+    for i, token in enumerate(tokens):
+        if token == ("op", "("):
+            depth += 1
+        elif token == ("op", ")"):
+            depth -= 1
+        if depth == 0 and is_separator(tokens, i):
+            parts.append(current)
+            current = []
+        else:
+            current.append(token)
+    parts.append(current)
+    return parts
+
+
+def _split_commas(tokens: list) -> list:
+    return [part for part in _split_top(tokens, lambda t, i: t[i] == ("op", ",")) if part]
+
+
+def _split_conjuncts(tokens: list) -> list:
+    """Split a predicate on top-level AND, leaving the AND of a BETWEEN in place."""
+    parts, current, depth, between = [], [], 0, False
+    for token in tokens:
+        if token == ("op", "("):
+            depth += 1
+        elif token == ("op", ")"):
+            depth -= 1
+        if depth == 0 and token == ("word", "between"):
+            between = True
+        elif depth == 0 and token == ("word", "and"):
+            if between:
+                between = False
+            else:
+                parts.append(current)
+                current = []
+                continue
+        current.append(token)
+    parts.append(current)
+    return [part for part in parts if part]
+
+
+def _is_name(token) -> bool:
+    return token[0] == "name" or (token[0] == "word" and token[1] not in _KEYWORDS)
+
+
+class _Scope:
+    """Name resolution for one SELECT: table aliases and projection aliases."""
+
+    def __init__(self, ctes: dict):
+        self.ctes = ctes
+        self.tables = {}
+        self.select_aliases = {}
+
+    def table(self, name: str) -> str:
+        return self.ctes.get(name, name)
+
+    def qualify(self, qualifier: str) -> str:
+        return self.tables.get(qualifier, self.table(qualifier))
+
+    def default_table(self):
+        """The only table in scope, used to qualify bare column names."""
+        names = set(self.tables.values())
+        return names.pop() if len(names) == 1 else None
+
+
+def _expr(tokens: list, scope: _Scope, use_aliases: bool = False) -> str:
+    """Canonical text of an expression: aliases resolved, columns qualified, spacing normalised."""
+    out = []
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        if (kind, text) == ("op", "(") and i + 1 < len(tokens) and tokens[i + 1][1] in ("select", "with"):
+            end = _matching_paren(tokens, i)
+            out.append("(" + _canonical(tokens[i + 1:end], scope.ctes) + ")")
+            i = end + 1
+            continue
+        if _is_name((kind, text)) and i + 2 < len(tokens) and tokens[i + 1] == ("op", "."):
+            column = tokens[i + 2][1]
+            out.append(f"{scope.qualify(text)}.{column}")
+            i += 3
+            continue
+        if _is_name((kind, text)):
+            is_function = i + 1 < len(tokens) and tokens[i + 1] == ("op", "(")
+            if is_function:
+                out.append(text)
+            elif use_aliases and text in scope.select_aliases:
+                out.append(scope.select_aliases[text])
+            else:
+                table = scope.default_table()
+                out.append(f"{table}.{text}" if table else text)
+        else:
+            out.append(text)
+        i += 1
+    return " ".join(out).replace("( ", "(").replace(" )", ")").replace(" ,", ",")
+
+
+def _predicate(tokens: list, scope: _Scope, use_aliases: bool = False) -> str:
+    """Canonical text of one comparison, with symmetric operands in a fixed order."""
+    ops = []
+    depth = 0
+    for i, (kind, text) in enumerate(tokens):
+        if text == "(" and kind == "op":
+            depth += 1
+        elif text == ")" and kind == "op":
+            depth -= 1
+        elif depth == 0 and kind == "op" and (text in _SYMMETRIC or text in _FLIPPED or text in ("<", "<=")):
+            ops.append(i)
+    if len(ops) == 1 and not {("word", "between"), ("word", "or")} & set(tokens):
+        i = ops[0]
+        op = tokens[i][1]
+        left = _expr(tokens[:i], scope, use_aliases)
+        right = _expr(tokens[i + 1:], scope, use_aliases)
+        if op in _FLIPPED:
+            op, left, right = _FLIPPED[op], right, left
+        elif op in _SYMMETRIC:
+            op = {"==": "=", "!=": "<>"}.get(op, op)
+            left, right = sorted((left, right))
+        return f"{left} {op} {right}"
+    return _expr(tokens, scope, use_aliases)
+
+
+def _table_ref(tokens: list, i: int, scope: _Scope, features: dict) -> int:
+    """Parse one table, subquery or parenthesised join starting at `i`; return the next index."""
+    if tokens[i] == ("op", "("):
+        end = _matching_paren(tokens, i)
+        inner = tokens[i + 1:end]
+        if inner and inner[0][1] in ("select", "with"):
+            name = "(" + _canonical(inner, scope.ctes) + ")"
+        else:
+            _parse_from(inner, scope, features)
+            name = None
+        i = end + 1
+    elif _is_name(tokens[i]):
+        name = tokens[i][1]
+        i += 1
+        # schema.table
+        while i + 1 < len(tokens) and tokens[i] == ("op", ".") and _is_name(tokens[i + 1]):
+            name = tokens[i + 1][1]
+            i += 2
+        name = scope.table(name)
+    else:
+        raise SqlParseError(f"Expected a table name, got {tokens[i][1]!r}")
+
+    alias = None
+    if i < len(tokens) and tokens[i] == ("word", "as"):
+        i += 1
+    if i < len(tokens) and _is_name(tokens[i]):
+        alias = tokens[i][1]
+        i += 1
+    if name is not None:
+        features["tables"][name] += 1
+        scope.tables[alias or name] = name
+        scope.tables.setdefault(name, name)
+    return i
+
+
+def _parse_from(tokens: list, scope: _Scope, features: dict):
+    """Collect tables into `scope` and `features`, and join conditions into `features['joins']`."""
+    i = _table_ref(tokens, 0, scope, features) if tokens else 0
+    pending = []
+    while i < len(tokens):
+        token = tokens[i]
+        if token == ("op", ","):
+            i = _table_ref(tokens, i + 1, scope, features)
+        elif token[0] == "word" and token[1] in _JOIN_WORDS:
+            while i < len(tokens) and tokens[i][0] == "word" and tokens[i][1] in _JOIN_WORDS:
+                i += 1
+            i = _table_ref(tokens, i, scope, features)
+        elif token == ("word", "on"):
+            end = i + 1
+            depth = 0
+            while end < len(tokens):
+                if tokens[end] == ("op", "("):
+                    depth += 1
+                elif tokens[end] == ("op", ")"):
+                    depth -= 1
+                elif depth == 0 and (tokens[end] == ("op", ",") or
+                                     (tokens[end][0] == "word" and tokens[end][1] in _JOIN_WORDS)):
+                    break
+                end += 1
+            # Resolve after all tables are known, since ON may name later aliases
+            pending.append(tokens[i + 1:end])
+            i = end
+        elif token == ("word", "using") and i + 1 < len(tokens) and tokens[i + 1] == ("op", "("):
+            end = _matching_paren(tokens, i + 1)
+            for column in _split_commas(tokens[i + 2:end]):
+                features["joins"][f"using {column[0][1]}"] += 1
+            i = end + 1
+        else:
+            raise SqlParseError(f"Unexpected {token[1]!r} in FROM clause")
+    for condition in pending:
+        for conjunct in _split_conjuncts(condition):
+            features["joins"][_predicate(conjunct, scope)] += 1
+
+
+def _clauses(tokens: list) -> dict:
+    """Split a SELECT core into its clauses by top-level keywords."""
+    if not tokens or tokens[0] != ("word", "select"):
+        raise SqlParseError("Expected SELECT")
+    clauses = {"select": []}
+    current = clauses["select"]
+    depth = 0
+    i = 1
+    while i < len(tokens):
+        token = tokens[i]
+        if token == ("op", "("):
+            depth += 1
+        elif token == ("op", ")"):
+            depth -= 1
+        if depth == 0 and token[0] == "word" and token[1] in _CLAUSES:
+            name = token[1]
+            if name in ("group", "order"):
+                if i + 1 >= len(tokens) or tokens[i + 1] != ("word", "by"):
+                    raise SqlParseError(f"Expected BY after {name.upper()}")
+                i += 1
+                name += "_by"
+            current = clauses[name] = []
+        else:
+            current.append(token)
+        i += 1
+    return clauses
+
+
+def _parse_core(tokens: list, ctes: dict, features: dict):
+    """Add the features of one SELECT core (no set operators) to `features`."""
+    clauses = _clauses(tokens)
+    scope = _Scope(ctes)
+    _parse_from(clauses.get("from", []), scope, features)
+
+    select = clauses["select"]
+    if select and select[0] == ("word", "distinct"):
+        features["select"]["distinct"] += 1
+        select = select[1:]
+    elif select and select[0] == ("word", "all"):
+        select = select[1:]
+    projections = []
+    for item in _split_commas(select):
+        alias = None
+        if len(item) >= 3 and item[-2] == ("word", "as"):
+            alias, item = item[-1][1], item[:-2]
+        elif len(item) >= 2 and _is_name(item[-1]) and (item[-2][0] != "op" or item[-2][1] == ")"):
+            alias, item = item[-1][1], item[:-1]
+        expression = _expr(item, scope)
+        projections.append(expression)
+        if alias:
+            scope.select_aliases[alias] = expression
+        features["select"][expression] += 1
+
+    for conjunct in _split_conjuncts(clauses.get("where", [])):
+        features["where"][_predicate(conjunct, scope)] += 1
+
+    def resolve(item):
+        # Positional references (GROUP BY 1 / ORDER BY 2) name a projection
+        if len(item) == 1 and item[0][0] == "num" and item[0][1].isdigit():
+            position = int(item[0][1]) - 1
+            if 0 <= position < len(projections):
+                return projections[position]
+        return _expr(item, scope, use_aliases=True)
+
+    for item in _split_commas(clauses.get("group_by", [])):
+        features["group_by"][resolve(item)] += 1
+    for conjunct in _split_conjuncts(clauses.get("having", [])):
+        features["having"][_predicate(conjunct, scope, use_aliases=True)] += 1
+
+    for item in _split_commas(clauses.get("order_by", [])):
+        direction = "asc"
+        if len(item) >= 3 and item[-2] == ("word", "nulls"):
+            item = item[:-2]
+        if item and item[-1] in (("word", "asc"), ("word", "desc")):
+            direction, item = item[-1][1], item[:-1]
+        features["order_by"][f"{resolve(item)} {direction}"] += 1
+
+    limit = clauses.get("limit", [])
+    offset = clauses.get("offset", [])
+    parts = _split_commas(limit)
+    if len(parts) == 2:
+        # LIMIT offset, count
+        offset, limit = parts
+    if limit:
+        features["limit"][f"limit {_expr(limit, scope)}"] += 1
+    if offset:
+        features["limit"][f"offset {_expr(offset, scope)}"] += 1
+
+
+def _features(tokens: list, ctes: dict = None) -> dict:
+    """Component name -> Counter of canonical items for a full query (WITH and set operators included)."""
+    ctes = dict(ctes or {})
+    features = {component: Counter() for component in COMPONENTS}
+    if tokens and tokens[0] == ("word", "with"):
+        i = 1
+        if i < len(tokens) and tokens[i] == ("word", "recursive"):
+            i += 1
+        while True:
+            if i >= len(tokens) or not _is_name(tokens[i]):
+                raise SqlParseError("Expected a CTE name")
+            name = tokens[i][1]
+            i += 1
+            if i < len(tokens) and tokens[i] == ("op", "("):
+                i = _matching_paren(tokens, i) + 1
+            if i >= len(tokens) or tokens[i] != ("word", "as") or tokens[i + 1] != ("op", "("):
+                raise SqlParseError("Expected AS ( after CTE name")
+            end = _matching_paren(tokens, i + 1)
+            # A CTE stands for its body, so differently named CTEs with the same body compare equal
+            ctes[name] = "(" + _canonical(tokens[i + 2:end], ctes) + ")"
+            i = end + 1
+            if i < len(tokens) and tokens[i] == ("op", ","):
+                i += 1
+                continue
+            break
+        tokens = tokens[i:]
+
+    cores = [[]]
+    depth = 0
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == ("op", "("):
+            depth += 1
+        elif token == ("op", ")"):
+            depth -= 1
+        if depth == 0 and token[0] == "word" and token[1] in _COMPOUND:
+            operator = token[1]
+            if i + 1 < len(tokens) and tokens[i + 1] == ("word", "all"):
+                operator += " all"
+                i += 1
+            features["compound"][operator] += 1
+            cores.append([])
+        else:
+            cores[-1].append(token)
+        i += 1
+    for core in cores:
+        _parse_core(core, ctes, features)
+    return features
+
+
+def _canonical(tokens: list, ctes: dict) -> str:
+    """Order-independent text of a nested query, for comparing subqueries as a whole."""
+    features = _features(tokens, ctes)
+    return "; ".join(
+        f"{component}: {', '.join(sorted(features[component].elements()))}"
+        for component in COMPONENTS if features[component]
+    )
+
+
+def parse_sql(sql: str) -> dict:
+    """
+    Parse a query into normalised structural components.
+
+    Table aliases are resolved to table names, projection aliases are dropped
+    (and substituted where GROUP BY / HAVING / ORDER BY refer to them), columns
+    of a single-table query are qualified, and WHERE / HAVING / ON are split
+    into conjuncts with symmetric comparisons in a fixed order.
+
+    Args:
+        sql: A single SELECT statement (optionally with WITH and set operators)
+
+    Returns:
+        Dictionary mapping each name in COMPONENTS to a Counter of canonical items
+
+    Raises:
+        SqlParseError: If the query is outside the supported subset
+    """
+    tokens = _tokenize(sql)
+    statements = [part for part in _split_top(tokens, lambda t, i: t[i] == ("op", ";")) if part]
+    if len(statements) != 1:
+        raise SqlParseError(f"Expected one statement, got {len(statements)}")
+    try:
+        return _features(statements[0])
+    except (IndexError, KeyError) as e:
+        raise SqlParseError(f"Malformed query: {e}") from e
+
+
+def component_scores(generated: dict, expected: dict) -> dict:
+    """
+    F1 overlap of each component present in either parsed query.
+
+    Args:
+        generated: parse_sql output for the generated query
+        expected: parse_sql output for the gold query
+
+    Returns:
+        Dictionary mapping component names to scores between 0 and 1
+    """
+    scores = {}
+    for component in COMPONENTS:
+        gen, exp = generated[component], expected[component]
+        total = sum(gen.values()) + sum(exp.values())
+        if total:
+            scores[component] = 2 * sum((gen & exp).values()) / total
+    return scores
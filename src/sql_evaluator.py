@@ -1,4 +1,10 @@
+import math
 import re
+from collections import Counter
+from functools import lru_cache
+from src.sql_ast import SqlParseError, component_scores, parse_sql
+from src.sql_response import QueryBudgetExceeded
+from src.sql_validation import PreflightError
 
 
 def normalize_sql(sql):
@@ -11,16 +17,11 @@ def normalize_sql(sql):
     return sql
 
 
-def calculate_sql_match_percent(generated_sql, expected_sql):
+def calculate_token_match_percent(generated_sql, expected_sql):
     """
-    Calculate what percentage of SQL query matches.
+    Percentage of the expected query's tokens that appear in the generated query.
     
-    Args:
-        generated_sql: SQL query generated by the model
-        expected_sql: Expected SQL query from test data
-        
-    Returns:
-        Percentage match (0-100)
+    Fallback for queries the structural parser can't handle.
     """
     if not generated_sql or not expected_sql:
         return 0.0
@@ -42,28 +43,192 @@ def calculate_sql_match_percent(generated_sql, expected_sql):
     return round(match_percent, 2)
 
 
+@lru_cache(maxsize=4096)
+def parse_gold_sql(expected_sql):
+    """
+    Parsed gold query, memoised so each test case's SQL is parsed once per process.
+    
+    Returns:
+        parse_sql output (shared; do not modify), or None if the query can't be parsed
+    """
+    try:
+        return parse_sql(expected_sql)
+    except SqlParseError:
+        return None
+
+
+def sql_component_scores(generated_sql, expected_sql):
+    """
+    Per-clause structural match between two queries.
+    
+    Args:
+        generated_sql: SQL query generated by the model
+        expected_sql: Expected SQL query from test data
+        
+    Returns:
+        Dictionary mapping component names (select, tables, joins, where, group_by,
+        having, order_by, limit, compound) to scores between 0 and 1, or None if
+        either query can't be parsed
+    """
+    expected = parse_gold_sql(expected_sql)
+    if expected is None:
+        return None
+    try:
+        generated = parse_sql(generated_sql)
+    except SqlParseError:
+        return None
+    return component_scores(generated, expected)
+
+
+def calculate_sql_match_percent(generated_sql, expected_sql):
+    """
+    Calculate what percentage of SQL query matches.
+    
+    Both queries are parsed into normalised clauses (aliases resolved, conjuncts
+    split, symmetric comparisons ordered), and the score is the mean overlap of
+    the clauses present in either query. Falls back to token overlap when a
+    query can't be parsed.
+    
+    Args:
+        generated_sql: SQL query generated by the model
+        expected_sql: Expected SQL query from test data
+        
+    Returns:
+        Percentage match (0-100)
+    """
+    if not generated_sql or not expected_sql:
+        return 0.0
+    
+    scores = sql_component_scores(generated_sql, expected_sql)
+    if scores is None:
+        return calculate_token_match_percent(generated_sql, expected_sql)
+    if not scores:
+        return 0.0
+    return round(sum(scores.values()) / len(scores) * 100.0, 2)
+
+
+# Decimal places floats are rounded to before comparison
+FLOAT_PRECISION = 6
+
+
+def _canonical_value(value):
+    """Map a value to a hashable, type-normalised form: NULLs, ints, floats and bools compare by value."""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (bool, int)):
+        return (1, int(value))
+    if isinstance(value, float):
+        if math.isnan(value):
+            return (0, 1)
+        rounded = round(value, FLOAT_PRECISION)
+        return (1, int(rounded)) if rounded.is_integer() else (1, rounded)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return (3, bytes(value).hex())
+    return (2, str(value))
+
+
 def normalize_row_values(row):
-    """Extract row values as sorted tuple (ignore column names)."""
-    values = list(row.values()) if isinstance(row, dict) else list(row)
-    return tuple(sorted(values, key=str))
+    """Canonical row key: normalised values as a sorted tuple (ignore column names and order)."""
+    values = row.values() if isinstance(row, dict) else row
+    return tuple(sorted(_canonical_value(v) for v in values))
+
+
+def expected_row_counts(expected_result) -> Counter:
+    """
+    Multiset of canonical row keys for a gold result.
+    
+    Compute it once per test case and pass it as `expected_counts` when
+    scoring several generated queries against the same gold result.
+    
+    Args:
+        expected_result: Expected result from test data
+        
+    Returns:
+        Counter mapping canonical row keys to their number of occurrences
+    """
+    return Counter(normalize_row_values(row) for row in expected_result)
 
 
 def calculate_answer_match_percent(actual_result, expected_result):
-    """Calculate percentage of matching rows."""
-    if isinstance(actual_result, str) or not expected_result:
+    """
+    Calculate percentage of matching rows.
+    
+    Rows are compared as multisets of canonical keys, so each expected row can
+    be matched by at most one actual row. Runs in O(n + m).
+    """
+    if isinstance(actual_result, (str, QueryBudgetExceeded, PreflightError)) or not expected_result:
         return 0.0
     
-    actual = list(actual_result) if not isinstance(actual_result, list) else actual_result
-    expected = list(expected_result) if not isinstance(expected_result, list) else expected_result
+    return calculate_answer_match_percent_counts(
+        Counter(normalize_row_values(row) for row in actual_result), expected_result
+    )
+
+
+def calculate_answer_match_percent_counts(actual_counts: Counter, expected_result, expected_counts: Counter = None):
+    """
+    Calculate percentage of matching rows from an actual result already reduced
+    to canonical row counts (e.g. while voting on candidates).
+    """
+    if not expected_result:
+        return 0.0
+    if expected_counts is None:
+        expected_counts = expected_row_counts(expected_result)
+    matches = sum(min(count, actual_counts[key]) for key, count in expected_counts.items())
+    return round((matches / len(expected_result)) * 100.0, 2)
+
+
+def calculate_answer_match_percent_streaming(batches, expected_result, expected_counts: Counter = None):
+    """
+    Calculate percentage of matching rows from a stream of result batches.
+    
+    Rows are compared as they arrive and never accumulated. Iteration stops as
+    soon as every expected row has been matched, since later rows can no longer
+    change the score.
+    
+    Args:
+        batches: Iterable of row batches (e.g. an AnswerStream)
+        expected_result: Expected result from test data
+        expected_counts: `expected_row_counts(expected_result)`, if already computed
+        
+    Returns:
+        Percentage match (0-100)
+    """
+    if not expected_result:
+        return 0.0
     
-    if len(expected) == 0:
-        return 100.0 if len(actual) == 0 else 0.0
+    remaining = Counter(expected_counts if expected_counts is not None else expected_row_counts(expected_result))
+    unmatched = len(expected_result)
     
-    actual_normalized = [normalize_row_values(row) for row in actual]
-    expected_normalized = [normalize_row_values(row) for row in expected]
+    iterator = iter(batches)
+    try:
+        for batch in iterator:
+            for row in batch:
+                key = normalize_row_values(row)
+                if remaining[key] > 0:
+                    remaining[key] -= 1
+                    unmatched -= 1
+            if not unmatched:
+                break
+    finally:
+        # Stop the query early instead of draining the remaining rows
+        if hasattr(iterator, "close"):
+            iterator.close()
     
-    matches = sum(1 for row in expected_normalized if row in actual_normalized)
-    return round((matches / len(expected)) * 100.0, 2)
+    matches = len(expected_result) - unmatched
+    return round((matches / len(expected_result)) * 100.0, 2)
+
+
+def error_category(result):
+    """
+    Category of a failed execution: the pre-flight category (syntax, unknown_table,
+    unknown_column, forbidden, ...), "runtime" for errors raised while executing,
+    or None if the query ran (including running out of budget).
+    """
+    if isinstance(result, PreflightError):
+        return result.category
+    if isinstance(result, str):
+        return "runtime"
+    return None
 
 
 def evaluate_answer(actual_result, generated_sql=None, expected_sql=None, expected_result=None):
@@ -71,17 +236,22 @@ def evaluate_answer(actual_result, generated_sql=None, expected_sql=None, expect
     Evaluate SQL and answer accuracy.
     
     Args:
-        actual_result: Result from executing SQL (list of dicts or error string)
+        actual_result: Result from executing SQL (list of dicts, PreflightError,
+                       QueryBudgetExceeded or error string)
         generated_sql: SQL query generated by the model
         expected_sql: Expected SQL query from test data
         expected_result: Expected result from test data
         
     Returns:
-        Dictionary with: {'syntax_ok': bool, 'sql_match_percent': float, 'answer_match_percent': float}
+        Dictionary with: {'syntax_ok': bool, 'sql_match_percent': float, 'answer_match_percent': float,
+                          'budget_exceeded': str or None, 'error_category': str or None}
     """
     # 0. Check for syntax errors first
-    # SQL executed successfully if result is not an error string
-    syntax_ok = not isinstance(actual_result, str)
+    # SQL is syntactically OK if it passed pre-flight validation (it compiled against
+    # the schema and is read-only); a query that ran out of budget or failed at
+    # runtime was valid SQL but produced no answer
+    budget_exceeded = actual_result.reason if isinstance(actual_result, QueryBudgetExceeded) else None
+    syntax_ok = not isinstance(actual_result, PreflightError)
     
     # 1. SQL syntax/match percentage
     sql_match_percent = 0.0
@@ -96,5 +266,55 @@ def evaluate_answer(actual_result, generated_sql=None, expected_sql=None, expect
     return {
         'syntax_ok': syntax_ok,
         'sql_match_percent': sql_match_percent,
-        'answer_match_percent': answer_match_percent
+        'answer_match_percent': answer_match_percent,
+        'budget_exceeded': budget_exceeded,
+        'error_category': error_category(actual_result)
+    }
+
+
+def evaluate_answer_stream(answer_stream, generated_sql=None, expected_sql=None, expected_result=None,
+                           row_counts=None, expected_counts=None):
+    """
+    Evaluate SQL and answer accuracy, consuming the query result as a stream.
+    
+    Args:
+        answer_stream: AnswerStream for the generated SQL
+        generated_sql: SQL query generated by the model
+        expected_sql: Expected SQL query from test data
+        expected_result: Expected result from test data
+        row_counts: Counter of canonical rows if `answer_stream` was already consumed
+                    (e.g. by `self_consistency.vote`); scored without executing again
+        expected_counts: `expected_row_counts(expected_result)`, if already computed
+        
+    Returns:
+        Same dictionary as `evaluate_answer`, plus 'rows_read' and 'truncated'
+    """
+    if row_counts is not None:
+        answer_match_percent = calculate_answer_match_percent_counts(row_counts, expected_result, expected_counts)
+    elif expected_result:
+        answer_match_percent = calculate_answer_match_percent_streaming(answer_stream, expected_result,
+                                                                        expected_counts)
+    else:
+        # Nothing to compare against; read one batch to learn whether the SQL runs
+        iterator = iter(answer_stream)
+        next(iterator, None)
+        iterator.close()
+        answer_match_percent = 0.0
+    
+    error = answer_stream.error
+    if error is not None:
+        answer_match_percent = 0.0
+    
+    sql_match_percent = 0.0
+    if generated_sql and expected_sql:
+        sql_match_percent = calculate_sql_match_percent(generated_sql, expected_sql)
+    
+    return {
+        'syntax_ok': not isinstance(error, PreflightError),
+        'sql_match_percent': sql_match_percent,
+        'answer_match_percent': answer_match_percent,
+        'budget_exceeded': error.reason if isinstance(error, QueryBudgetExceeded) else None,
+        'error_category': error_category(error),
+        'rows_read': answer_stream.rows_read,
+        'truncated': answer_stream.truncated
     }
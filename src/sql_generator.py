@@ -1,51 +1,527 @@
 import os
 import yaml
 import re
+import string
+import json
+import random
 import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
-from openai import OpenAI
-from utils import load_db, get_schema
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from src.schema_cache import get_schema_text
+from src.schema_retrieval import relevant_schema_text
+from src.prompts import BATCH_PROMPTS
+from src.inference_client import get_client, get_async_client, resolve_base_url
+from src.rate_limiter import get_rate_limiter, parse_retry_after
+from src.response_cache import get_response_cache, is_replay_mode, ReplayCacheMiss
+from src.self_consistency import vote
 
 load_dotenv()
 
+# Parsed models.yaml, reloaded only when the file changes: (mtime_ns, config)
+_config_cache = None
+
 
 def load_model_config():
-    """Load model configuration from YAML file."""
+    """Load model configuration from YAML file (cached until the file is modified)."""
+    global _config_cache
     config_path = Path(__file__).parent / "models.yaml"
-    with open(config_path, 'r') as f:
-        return yaml.safe_load(f)
+    mtime_ns = config_path.stat().st_mtime_ns
+    if _config_cache is None or _config_cache[0] != mtime_ns:
+        with open(config_path, 'r') as f:
+            _config_cache = (mtime_ns, yaml.safe_load(f))
+    return _config_cache[1]
+
+
+# Stray tags left around the SQL after extraction
+_TAG_RE = re.compile(r'<[^>]*>')
+
+# Characters trimmed from the ends of extracted SQL (with whitespace)
+_LEADING_JUNK = "<[{}" + string.whitespace
+_TRAILING_JUNK = ">]}" + string.whitespace
+
+
+class SqlStreamExtractor:
+    """
+    Incremental state machine that extracts SQL from a (possibly streamed) response.
+    
+    Text is fed chunk by chunk. The first complete `<sql_query>...</sql_query>`
+    block or ``` code fence wins, and `feed` returns True as soon as it has
+    been seen so a stream can be closed early. Markers split across chunks are
+    handled by re-scanning only the tail of the buffer.
+    
+    States: "scan" (looking for an opening marker), "tag" / "fence" (inside a
+    block, looking for its closing marker) and "done".
+    """
+    
+    OPEN_TAG = "<sql_query>"
+    CLOSE_TAG = "</sql_query>"
+    FENCE = "```"
+    
+    def __init__(self):
+        self.buffer = ""
+        self._lower = ""
+        self.state = "scan"
+        self._scan_pos = 0
+        self._body_start = 0
+        self._body_end = None
+    
+    @property
+    def done(self) -> bool:
+        return self.state == "done"
+    
+    def feed(self, text: str) -> bool:
+        """Consume the next chunk; return True once a complete SQL block has been seen."""
+        if self.done or not text:
+            return self.done
+        self.buffer += text
+        self._lower += text.lower()
+        
+        while True:
+            if self.state == "scan":
+                tag_pos = self._lower.find(self.OPEN_TAG, self._scan_pos)
+                fence_pos = self._lower.find(self.FENCE, self._scan_pos)
+                if tag_pos == -1 and fence_pos == -1:
+                    # Keep enough of the tail to catch a marker split across chunks
+                    self._scan_pos = max(self._scan_pos, len(self._lower) - len(self.OPEN_TAG) + 1)
+                    return False
+                if fence_pos == -1 or (tag_pos != -1 and tag_pos < fence_pos):
+                    self.state = "tag"
+                    self._body_start = self._scan_pos = tag_pos + len(self.OPEN_TAG)
+                else:
+                    self.state = "fence"
+                    self._body_start = self._scan_pos = fence_pos + len(self.FENCE)
+            else:
+                marker = self.CLOSE_TAG if self.state == "tag" else self.FENCE
+                end_pos = self._lower.find(marker, self._scan_pos)
+                if end_pos == -1:
+                    self._scan_pos = max(self._scan_pos, len(self._lower) - len(marker) + 1)
+                    return False
+                self._body_end = end_pos
+                self.state = "done"
+                return True
+    
+    def result(self) -> str:
+        """
+        Return the extracted SQL for everything fed so far.
+        
+        An unterminated block (e.g. generation stopped at a `</sql_query>` stop
+        sequence) yields its content so far; with no markers at all, the whole
+        response is treated as SQL.
+        """
+        if self.state == "scan":
+            sql = self.buffer
+        else:
+            sql = self.buffer[self._body_start:self._body_end]
+        
+        sql = sql.strip()
+        # Unwrap a code fence nested inside the tag, with its optional language word
+        if sql.startswith(self.FENCE):
+            sql = sql[len(self.FENCE):]
+        if sql[:3].lower() == "sql" and (len(sql) == 3 or sql[3].isspace()):
+            sql = sql[3:]
+        if sql.endswith(self.FENCE):
+            sql = sql[:-len(self.FENCE)]
+        
+        # Remove any remaining angle bracket tags, then brackets and whitespace at both ends
+        sql = _TAG_RE.sub('', sql)
+        return sql.lstrip(_LEADING_JUNK).rstrip(_TRAILING_JUNK)
 
 
 def extract_sql(response_text: str) -> str:
     """Extract SQL from API response, removing brackets and newlines at start/end."""
-    sql = response_text.strip()
+    extractor = SqlStreamExtractor()
+    extractor.feed(response_text)
+    return extractor.result()
+
+
+def extract_sql_batch(response_text: str, count: int) -> list:
+    """
+    Demultiplex a batched response into one SQL query per question.
     
-    # Extract from markdown code blocks
-    sql_match = re.search(r'```(?:sql)?\s*(.*?)\s*```', sql, re.DOTALL)
-    if sql_match:
-        sql = sql_match.group(1).strip()
+    Args:
+        response_text: Response containing `<sql_query id="N">` blocks
+        count: Number of questions in the batch (ids 1..count)
+        
+    Returns:
+        List of `count` SQL queries in question order; "" for missing ids
+    """
+    blocks = {}
+    for query_id, body in re.findall(r'<sql_query\s+id\s*=\s*["\']?(\d+)["\']?\s*>(.*?)</sql_query>',
+                                     response_text, re.DOTALL | re.IGNORECASE):
+        # Keep the first block per id; later ones are usually echoed examples
+        blocks.setdefault(int(query_id), body)
+    return [extract_sql(blocks[i]) if i in blocks else "" for i in range(1, count + 1)]
+
+
+def _schema_text_for(config: dict, db_path: str, questions: list) -> str:
+    """
+    Schema text to send with a prompt for the given questions.
     
-    # Extract from sql_query tags
-    tag_match = re.search(r'<sql_query>\s*(.*?)\s*</sql_query>', sql, re.DOTALL | re.IGNORECASE)
-    if tag_match:
-        sql = tag_match.group(1).strip()
+    The full schema by default; with `schema_retrieval` enabled in models.yaml,
+    only the tables relevant to the questions and their join paths.
+    """
+    retrieval = config.get("schema_retrieval", {})
+    if not retrieval.get("enabled", False):
+        return get_schema_text(db_path)
+    return relevant_schema_text(questions, db_path, retrieval.get("top_k", 5))
+
+
+def _get_api_key():
+    """Return the Fireworks API key or raise if it is not configured."""
+    api_key = os.getenv("FIREWORKS_API_KEY")
+    if not api_key:
+        raise ValueError("FIREWORKS_API_KEY not set")
+    return api_key
+
+
+def _completion_kwargs(config: dict, model: str, prompt: str, stream: bool = False) -> dict:
+    """Build the chat completion request arguments from the model config."""
+    kwargs = dict(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=config["temperature"],
+        max_tokens=config["max_tokens"],
+        top_p=config.get("top_p", 1),
+        presence_penalty=config.get("presence_penalty", 0),
+        frequency_penalty=config.get("frequency_penalty", 0)
+    )
+    if stream:
+        kwargs["stream"] = True
+        # A final chunk reports the usage, to settle the rate limiter's token estimate
+        kwargs["stream_options"] = {"include_usage": True}
+        # Let the provider stop generating right at the closing tag
+        if config.get("stop_sequences", True):
+            kwargs["stop"] = [SqlStreamExtractor.CLOSE_TAG]
+    return kwargs
+
+
+def _chunk_text(chunk) -> str:
+    """Text delta of a streamed chunk ("" for role-only or empty chunks)."""
+    if not chunk.choices:
+        return ""
+    return chunk.choices[0].delta.content or ""
+
+
+def _read_stream(stream):
+    """
+    Consume a streamed completion until a complete SQL block is seen, then close it.
     
-    # Remove any remaining angle bracket tags
-    sql = re.sub(r'<[^>]*>', '', sql)
+    The usage chunk that ends the stream is only seen when the stream isn't
+    closed early (e.g. when the provider stops at the closing tag).
+    
+    Returns:
+        Tuple of (text read, `time.perf_counter()` at the first text chunk or None,
+        reported usage or None)
+    """
+    extractor = SqlStreamExtractor()
+    first_token = None
+    usage = None
+    try:
+        for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage
+            text = _chunk_text(chunk)
+            if text and first_token is None:
+                first_token = time.perf_counter()
+            if extractor.feed(text):
+                break
+    finally:
+        # Closing the response stops the server from generating the rest
+        stream.close()
+    return extractor.buffer, first_token, usage
+
+
+async def _read_stream_async(stream):
+    """Async counterpart of `_read_stream`."""
+    extractor = SqlStreamExtractor()
+    first_token = None
+    usage = None
+    try:
+        async for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage
+            text = _chunk_text(chunk)
+            if text and first_token is None:
+                first_token = time.perf_counter()
+            if extractor.feed(text):
+                break
+    finally:
+        await stream.close()
+    return extractor.buffer, first_token, usage
+
+
+def _estimate_tokens(kwargs: dict, completion: str = None) -> int:
+    """
+    Rough token cost of a request: ~4 characters per token.
+    
+    Counts the completion text when given, otherwise the full completion budget
+    (per requested choice).
+    """
+    prompt_chars = sum(len(m["content"]) for m in kwargs["messages"])
+    if completion is not None:
+        return (prompt_chars + len(completion)) // 4
+    return prompt_chars // 4 + kwargs.get("max_tokens", 0) * kwargs.get("n", 1)
+
+
+def _usage_tokens(response):
+    """Total tokens reported by the API, or None if usage is missing."""
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None) if usage else None
+
+
+def _token_usage(usage, kwargs: dict, content: str):
+    """
+    Return (prompt, completion, total) tokens of a completion.
+    
+    Taken from the usage the API reports (in the response, or in the last
+    chunk of a stream); estimated at ~4 characters per token otherwise (e.g.
+    a stream closed before its usage chunk).
+    """
+    if usage and getattr(usage, "total_tokens", None) is not None:
+        return usage.prompt_tokens, usage.completion_tokens, usage.total_tokens
+    prompt_tokens = sum(len(m["content"]) for m in kwargs["messages"]) // 4
+    completion_tokens = len(content) // 4
+    return prompt_tokens, completion_tokens, prompt_tokens + completion_tokens
+
+
+# Stats of a completion served from the response cache
+_CACHED_STATS = {"cached": True, "rate_limit_wait": 0.0, "generation": 0.0, "ttft": None,
+                 "prompt_tokens": 0, "completion_tokens": 0, "tokens": 0}
+
+
+def _completion_stats(usage, kwargs: dict, content: str, start: float, wait: float, first_token: float = None):
+    """
+    Timings and token counts of one API completion, given its reported usage (or None).
+    
+    `generation` and `ttft` are measured from `start` and exclude the `wait`
+    spent in the rate limiter, which is reported as `rate_limit_wait`.
+    """
+    prompt_tokens, completion_tokens, tokens = _token_usage(usage, kwargs, content)
+    return {
+        "cached": False,
+        "rate_limit_wait": wait,
+        "generation": time.perf_counter() - start - wait,
+        "ttft": first_token - start - wait if first_token is not None else None,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "tokens": tokens,
+    }
+
+
+def _merge_stats(stats: list) -> dict:
+    """Combine the stats of concurrent completions: token counts add up, timings are the slowest one's."""
+    merged = {"cached": all(s["cached"] for s in stats)}
+    for field in ("prompt_tokens", "completion_tokens", "tokens"):
+        merged[field] = sum(s[field] for s in stats)
+    for field in ("rate_limit_wait", "generation", "ttft"):
+        values = [s[field] for s in stats if s[field] is not None]
+        merged[field] = max(values) if values else None
+    return merged
+
+
+# Failures worth retrying besides 429: dropped connections, timeouts and 5xx responses
+_TRANSIENT_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError)
+
+
+def _transient_backoff(attempt: int) -> float:
+    """Seconds to wait before retrying a transient failure: capped exponential backoff with full jitter."""
+    return random.uniform(0, min(30.0, 2.0 ** attempt))
+
+
+def _create_completion(client, config: dict, model_name: str, kwargs: dict):
+    """
+    Call the chat completions API through the model's rate limiter.
+    
+    Retries up to `max_retries` times on 429 (waiting as the server asks) and
+    on connection errors, timeouts and 5xx responses (with jittered backoff).
+    A streamed response has no usage yet; the caller settles its token
+    estimate with `RateLimiter.settle` once the stream is read.
+    
+    Returns:
+        Tuple of (response, seconds spent waiting on the rate limiter and backoff)
+    """
+    limiter = get_rate_limiter(model_name, config)
+    estimated_tokens = _estimate_tokens(kwargs)
+    max_retries = config.get("max_retries", 5)
+    waited = 0.0
+    
+    for attempt in range(max_retries + 1):
+        start = time.perf_counter()
+        limiter.acquire(estimated_tokens)
+        waited += time.perf_counter() - start
+        try:
+            raw = client.chat.completions.with_raw_response.create(**kwargs)
+        except RateLimitError as e:
+            if attempt == max_retries:
+                raise
+            wait = limiter.on_rate_limited(parse_retry_after(e.response.headers), attempt)
+            print(f"Rate limited on {model_name}, retrying in {wait:.1f}s...")
+            continue
+        except _TRANSIENT_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            wait = _transient_backoff(attempt)
+            print(f"{type(e).__name__} on {model_name}, retrying in {wait:.1f}s...")
+            time.sleep(wait)
+            waited += wait
+            continue
+        response = raw.parse()
+        limiter.on_success(raw.headers, estimated_tokens, _usage_tokens(response))
+        return response, waited
+
+
+async def _create_completion_async(client, config: dict, model_name: str, kwargs: dict):
+    """Async counterpart of `_create_completion`."""
+    limiter = get_rate_limiter(model_name, config)
+    estimated_tokens = _estimate_tokens(kwargs)
+    max_retries = config.get("max_retries", 5)
+    waited = 0.0
+    
+    for attempt in range(max_retries + 1):
+        start = time.perf_counter()
+        await limiter.acquire_async(estimated_tokens)
+        waited += time.perf_counter() - start
+        try:
+            raw = await client.chat.completions.with_raw_response.create(**kwargs)
+        except RateLimitError as e:
+            if attempt == max_retries:
+                raise
+            wait = limiter.on_rate_limited(parse_retry_after(e.response.headers), attempt)
+            print(f"Rate limited on {model_name}, retrying in {wait:.1f}s...")
+            continue
+        except _TRANSIENT_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            wait = _transient_backoff(attempt)
+            print(f"{type(e).__name__} on {model_name}, retrying in {wait:.1f}s...")
+            await asyncio.sleep(wait)
+            waited += wait
+            continue
+        # The raw-response wrapper parses synchronously, also on the async client
+        response = raw.parse()
+        limiter.on_success(raw.headers, estimated_tokens, _usage_tokens(response))
+        return response, waited
+
+
+def _cache_lookup(config: dict, kwargs: dict, sample: int = 0):
+    """
+    Return (cache, key, cached_text) for a request; raise on a miss in replay mode.
+    
+    `sample` > 0 gives repeated samples of the same request their own cache entries.
+    """
+    cache = get_response_cache(config)
+    key = cache.make_key(dict(kwargs, sample=sample) if sample else kwargs) if cache else None
+    cached = cache.get(key) if cache else None
+    if cached is None and is_replay_mode():
+        raise ReplayCacheMiss(f"No cached response for {kwargs['model']} (replay mode)")
+    return cache, key, cached
+
+
+def _complete(config: dict, model_name: str, kwargs: dict, sample: int = 0):
+    """
+    Return (completion text, stats) for a request, served from the response cache when possible.
+    
+    Stats hold the token counts ('prompt_tokens', 'completion_tokens',
+    'tokens'), 'rate_limit_wait', 'generation' and 'ttft' (streamed requests
+    only) in seconds, and 'cached'. Cached responses cost no tokens. With `n`
+    in the request, the text is a JSON list with one completion per choice.
+    """
+    cache, key, cached = _cache_lookup(config, kwargs, sample)
+    if cached is not None:
+        return cached, dict(_CACHED_STATS)
     
-    # Remove brackets and newlines from beginning
-    while sql and sql[0] in '<[{}\n':
-        sql = sql[1:].strip()
+    # Shared client with a pooled, keep-alive connection
+    client = get_client(_get_api_key(), resolve_base_url(config), config=config)
+    start = time.perf_counter()
+    response, wait = _create_completion(client, config, model_name, kwargs)
+    if kwargs.get("stream"):
+        content, first_token, usage = _read_stream(response)
+    else:
+        content, first_token, usage = _response_content(response, kwargs), None, getattr(response, "usage", None)
+    stats = _completion_stats(usage, kwargs, content, start, wait, first_token)
+    if kwargs.get("stream"):
+        get_rate_limiter(model_name, config).settle(_estimate_tokens(kwargs), stats["tokens"])
+    if cache:
+        cache.put(key, kwargs["model"], content)
+    return content, stats
+
+
+async def _complete_async(config: dict, model_name: str, kwargs: dict, sample: int = 0):
+    """Async counterpart of `_complete`."""
+    cache, key, cached = _cache_lookup(config, kwargs, sample)
+    if cached is not None:
+        return cached, dict(_CACHED_STATS)
     
-    # Remove brackets and newlines from end
-    while sql and sql[-1] in '>]}\n':
-        sql = sql[:-1].strip()
+    client = get_async_client(_get_api_key(), resolve_base_url(config), config=config)
+    start = time.perf_counter()
+    response, wait = await _create_completion_async(client, config, model_name, kwargs)
+    if kwargs.get("stream"):
+        content, first_token, usage = await _read_stream_async(response)
+    else:
+        content, first_token, usage = _response_content(response, kwargs), None, getattr(response, "usage", None)
+    stats = _completion_stats(usage, kwargs, content, start, wait, first_token)
+    if kwargs.get("stream"):
+        get_rate_limiter(model_name, config).settle(_estimate_tokens(kwargs), stats["tokens"])
+    if cache:
+        cache.put(key, kwargs["model"], content)
+    return content, stats
+
+
+def _response_content(response, kwargs: dict) -> str:
+    """Completion text of a response; all choices as a JSON list when `n` was requested."""
+    if "n" in kwargs:
+        return json.dumps([choice.message.content or "" for choice in response.choices])
+    return response.choices[0].message.content
+
+
+def _complete_text(config: dict, model_name: str, kwargs: dict) -> str:
+    """Return the completion text for a request, served from the response cache when possible."""
+    return _complete(config, model_name, kwargs)[0]
+
+
+def _sampling_options(config: dict, samples: int = None):
+    """Return (samples, use_n) from `self_consistency` in models.yaml, with `samples` overriding."""
+    options = config.get("self_consistency", {})
+    if samples is None:
+        samples = options.get("samples", 1)
+    return samples, options.get("use_n", True)
+
+
+def _sample_texts(content: str, samples: int) -> list:
+    """Split the cached/returned text of an `n` request back into its completions."""
+    texts = json.loads(content)
+    return texts[:samples]
+
+
+def _complete_samples(config: dict, model_name: str, kwargs: dict, samples: int):
+    """
+    Return ([completion texts], stats) for `samples` completions of one request.
     
-    return sql
+    Uses the `n` parameter when `self_consistency.use_n` is set, otherwise
+    sends `samples` requests concurrently and merges their stats.
+    """
+    _, use_n = _sampling_options(config)
+    if use_n:
+        content, stats = _complete(config, model_name, dict(kwargs, n=samples))
+        return _sample_texts(content, samples), stats
+    with ThreadPoolExecutor(max_workers=samples) as executor:
+        results = list(executor.map(lambda i: _complete(config, model_name, kwargs, sample=i), range(samples)))
+    return [content for content, _ in results], _merge_stats([stats for _, stats in results])
+
 
+async def _complete_samples_async(config: dict, model_name: str, kwargs: dict, samples: int):
+    """Async counterpart of `_complete_samples`."""
+    _, use_n = _sampling_options(config)
+    if use_n:
+        content, stats = await _complete_async(config, model_name, dict(kwargs, n=samples))
+        return _sample_texts(content, samples), stats
+    results = await asyncio.gather(*[_complete_async(config, model_name, kwargs, sample=i) for i in range(samples)])
+    return [content for content, _ in results], _merge_stats([stats for _, stats in results])
 
-def generate_sql(question: str, prompts: list, model_name: str, db_path: str = "Chinook.db"):
+
+def generate_sql(question: str, prompts: list, model_name: str, db_path: str = "Chinook.db",
+                 stream: bool = None, samples: int = None):
     """
     Generate SQL from natural language question using all provided prompts.
     
@@ -54,28 +530,27 @@ def generate_sql(question: str, prompts: list, model_name: str, db_path: str = "
         prompts: List of tuples (prompt_name, prompt_func)
         model_name: Name of the model to use
         db_path: Path to database
+        stream: Stream completions and stop at the first complete SQL block
+                (defaults to `stream` in models.yaml)
+        samples: Candidates sampled per prompt (defaults to `self_consistency.samples`
+                 in models.yaml); with more than one, the candidates are executed and
+                 the SQL behind the majority result is returned
         
     Returns:
         Dictionary mapping prompt names to generated SQL queries
     """
-    api_key = os.getenv("FIREWORKS_API_KEY")
-    if not api_key:
-        raise ValueError("FIREWORKS_API_KEY not set")
-    
     # Load model config
     config = load_model_config()
     
     # Get model from config
     model = config["model"][model_name]
     
-    # Get schema (only once)
-    conn = load_db(db_path)
-    schema = get_schema(conn)
-    schema_text = "\n".join([f"{table}: {[c['name'] for c in cols]}" for table, cols in schema.items()])
-    conn.close()
+    # Get schema (introspected once per database fingerprint)
+    schema_text = _schema_text_for(config, db_path, [question])
     
-    # Initialize client
-    client = OpenAI(api_key=api_key, base_url="https://api.fireworks.ai/inference/v1")
+    if stream is None:
+        stream = config.get("stream", False)
+    samples, _ = _sampling_options(config, samples)
     
     # Store results for all prompts
     results = {}
@@ -85,22 +560,272 @@ def generate_sql(question: str, prompts: list, model_name: str, db_path: str = "
         # Create prompt using the provided function
         prompt = prompt_func(schema_text, question)
         
-        # Call API
-        response = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=config["temperature"],
-            max_tokens=config["max_tokens"],
-            top_p=config.get("top_p", 1),
-            presence_penalty=config.get("presence_penalty", 0),
-            frequency_penalty=config.get("frequency_penalty", 0)
-        )
+        if samples > 1:
+            # Self-consistency: vote among candidates by execution result
+            texts, _ = _complete_samples(config, model_name, _completion_kwargs(config, model, prompt), samples)
+            results[prompt_name] = vote([extract_sql(text) for text in texts], db_path)["selected_sql"]
+            continue
+        
+        # Call API (cached, and throttled by the model's rate limiter)
+        content = _complete_text(config, model_name, _completion_kwargs(config, model, prompt, stream))
         
-        sql = extract_sql(response.choices[0].message.content)
+        sql = extract_sql(content)
         results[prompt_name] = sql
+    
+    return results
+
+
+def _batch_requests(requests: list, batch_size: int) -> list:
+    """
+    Pack (question, prompt_func) requests into batches sharing one prompt function.
+    
+    Returns:
+        List of (prompt_func, [request indices]) with at most `batch_size` indices each
+    """
+    by_prompt = {}
+    for i, (_, prompt_func) in enumerate(requests):
+        by_prompt.setdefault(prompt_func, []).append(i)
+    return [
+        (prompt_func, indices[start:start + batch_size])
+        for prompt_func, indices in by_prompt.items()
+        for start in range(0, len(indices), batch_size)
+    ]
+
+
+def generate_sql_batch(questions: list, prompts: list, model_name: str,
+                       db_path: str = "Chinook.db", batch_size: int = 5):
+    """
+    Generate SQL for many questions, packing up to `batch_size` questions into each request.
+    
+    The schema is sent once per batch instead of once per question, using the
+    batched variant of each prompt from `prompts.BATCH_PROMPTS`.
+    
+    Args:
+        questions: List of natural language questions
+        prompts: List of tuples (prompt_name, prompt_func)
+        model_name: Name of the model to use
+        db_path: Path to database
+        batch_size: Maximum questions per request
         
-        # Delay to prevent rate limits
-        time.sleep(5)
+    Returns:
+        List of dictionaries mapping prompt names to generated SQL queries,
+        one per question and in the same order as `questions`
+    """
+    config = load_model_config()
+    model = config["model"][model_name]
+    
+    results = [{} for _ in questions]
+    for prompt_name, prompt_func in prompts:
+        for start in range(0, len(questions), batch_size):
+            batch = questions[start:start + batch_size]
+            prompt = BATCH_PROMPTS[prompt_func](_schema_text_for(config, db_path, batch), batch)
+            content = _complete_text(config, model_name, _completion_kwargs(config, model, prompt))
+            for offset, sql in enumerate(extract_sql_batch(content, len(batch))):
+                results[start + offset][prompt_name] = sql
     
     return results
 
+
+def _request_telemetry(stats: dict, prompt_build: float, queue_wait: float, extraction: float,
+                       share: int = 1) -> dict:
+    """
+    Telemetry of one (question, prompt) request, as recorded in the run journal.
+    
+    Queue wait covers both the concurrency limit and the rate limiter. For a
+    batched request (`share` questions), every question gets the batch's
+    timings and an equal share of its tokens.
+    """
+    generation = stats["generation"]
+    return {
+        "timings": {
+            "prompt_build": prompt_build,
+            "queue_wait": queue_wait + stats["rate_limit_wait"],
+            "ttft": stats["ttft"],
+            "generation": generation,
+            "extraction": extraction,
+        },
+        "prompt_tokens": round(stats["prompt_tokens"] / share),
+        "completion_tokens": round(stats["completion_tokens"] / share),
+        "tokens_per_second": stats["completion_tokens"] / generation if not stats["cached"] and generation > 0 else None,
+        "cached": stats["cached"],
+    }
+
+
+def _outcome(result):
+    """(result, telemetry) of a gathered request; a failed request gives (exception, None)."""
+    if isinstance(result, BaseException):
+        if not isinstance(result, Exception):
+            # Cancellation and interrupts still propagate
+            raise result
+        return result, None
+    return result
+
+
+async def generate_sql_requests_async(requests: list, model_name: str, db_path: str = "Chinook.db",
+                                      max_concurrency: int = None, batch_size: int = 1, stream: bool = None,
+                                      samples: int = None, telemetry: list = None, return_exceptions: bool = False):
+    """
+    Generate SQL for arbitrary (question, prompt_func) pairs concurrently.
+    
+    Every request is scheduled at once and a semaphore caps how many are in flight.
+    With `batch_size` > 1, requests sharing a prompt function are packed into
+    batched prompts of up to `batch_size` questions each. Streaming only
+    applies to single-question requests; batched responses are read in full.
+    
+    With `samples` > 1 (self-consistency), each request returns a dict with
+    'candidates' (one SQL per sample), 'tokens' and 'latency' instead of a
+    single SQL string; pass the candidates to `self_consistency.vote`.
+    
+    Args:
+        requests: List of tuples (question, prompt_func)
+        model_name: Name of the model to use
+        db_path: Path to database
+        max_concurrency: Maximum number of in-flight requests
+                         (defaults to `max_concurrency` in models.yaml)
+        batch_size: Maximum questions per API request
+        stream: Stream completions and stop at the first complete SQL block
+                (defaults to `stream` in models.yaml)
+        samples: Candidates sampled per request (defaults to `self_consistency.samples`
+                 in models.yaml); sampled completions are not streamed
+        telemetry: If given, extended with one dict per request (in request order) holding
+                   'timings' (prompt_build, queue_wait, ttft, generation and extraction
+                   seconds; ttft is None unless streamed), 'prompt_tokens',
+                   'completion_tokens', 'tokens_per_second' and 'cached'
+        return_exceptions: Return the exception of a failed request in its place (with None
+                           telemetry) instead of raising it, so other completions are kept
+        
+    Returns:
+        List of generated SQL queries (or candidate dicts when sampling),
+        in the same order as `requests`
+    """
+    config = load_model_config()
+    model = config["model"][model_name]
+    
+    if stream is None:
+        stream = config.get("stream", False)
+    if max_concurrency is None:
+        max_concurrency = config.get("max_concurrency", 8)
+    samples, _ = _sampling_options(config, samples)
+    if samples > 1 and batch_size > 1:
+        raise ValueError("Self-consistency sampling requires single-question requests (batch_size=1)")
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def _sample_one(question, prompt_func):
+        start = time.perf_counter()
+        prompt = prompt_func(_schema_text_for(config, db_path, [question]), question)
+        queued = time.perf_counter()
+        async with semaphore:
+            sent = time.perf_counter()
+            texts, stats = await _complete_samples_async(config, model_name, _completion_kwargs(config, model, prompt),
+                                                         samples)
+            latency = time.perf_counter() - sent
+        candidates = [extract_sql(text) for text in texts]
+        request_telemetry = _request_telemetry(stats, queued - start, sent - queued,
+                                               time.perf_counter() - sent - latency)
+        return {"candidates": candidates, "tokens": stats["tokens"], "latency": latency}, request_telemetry
+    
+    async def _generate_one(question, prompt_func):
+        start = time.perf_counter()
+        prompt = prompt_func(_schema_text_for(config, db_path, [question]), question)
+        queued = time.perf_counter()
+        async with semaphore:
+            sent = time.perf_counter()
+            content, stats = await _complete_async(config, model_name, _completion_kwargs(config, model, prompt, stream))
+        received = time.perf_counter()
+        sql = extract_sql(content)
+        return sql, _request_telemetry(stats, queued - start, sent - queued, time.perf_counter() - received)
+    
+    if samples > 1 or batch_size <= 1:
+        generate = _sample_one if samples > 1 else _generate_one
+        generated = await asyncio.gather(*[generate(question, prompt_func) for question, prompt_func in requests],
+                                         return_exceptions=return_exceptions)
+        generated = [_outcome(result) for result in generated]
+        if telemetry is not None:
+            telemetry.extend(request_telemetry for _, request_telemetry in generated)
+        return [result for result, _ in generated]
+    
+    async def _generate_batch(prompt_func, indices):
+        start = time.perf_counter()
+        questions = [requests[i][0] for i in indices]
+        prompt = BATCH_PROMPTS[prompt_func](_schema_text_for(config, db_path, questions), questions)
+        queued = time.perf_counter()
+        async with semaphore:
+            sent = time.perf_counter()
+            content, stats = await _complete_async(config, model_name, _completion_kwargs(config, model, prompt))
+        received = time.perf_counter()
+        sqls = extract_sql_batch(content, len(indices))
+        return sqls, _request_telemetry(stats, queued - start, sent - queued, time.perf_counter() - received,
+                                        share=len(indices))
+    
+    batches = _batch_requests(requests, batch_size)
+    generated = await asyncio.gather(*[_generate_batch(prompt_func, indices) for prompt_func, indices in batches],
+                                     return_exceptions=return_exceptions)
+    
+    results = [""] * len(requests)
+    request_telemetry = [None] * len(requests)
+    for (_, indices), outcome in zip(batches, generated):
+        sqls, batch_telemetry = _outcome(outcome)
+        if isinstance(sqls, Exception):
+            # Every question of a failed batch fails with it
+            sqls = [sqls] * len(indices)
+        for i, sql in zip(indices, sqls):
+            results[i] = sql
+            request_telemetry[i] = batch_telemetry
+    if telemetry is not None:
+        telemetry.extend(request_telemetry)
+    return results
+
+
+async def generate_sql_many_async(questions: list, prompts: list, model_name: str, db_path: str = "Chinook.db",
+                                  max_concurrency: int = None, batch_size: int = 1, stream: bool = None,
+                                  samples: int = None):
+    """
+    Generate SQL for many questions concurrently using all provided prompts.
+    
+    Args:
+        questions: List of natural language questions
+        prompts: List of tuples (prompt_name, prompt_func)
+        model_name: Name of the model to use
+        db_path: Path to database
+        max_concurrency: Maximum number of in-flight requests
+                         (defaults to `max_concurrency` in models.yaml)
+        batch_size: Maximum questions per API request
+        stream: Stream completions and stop at the first complete SQL block
+        samples: Candidates sampled per prompt (defaults to `self_consistency.samples`
+                 in models.yaml); with more than one, the candidates are executed and
+                 the SQL behind the majority result is returned, as in `generate_sql`
+        
+    Returns:
+        List of dictionaries mapping prompt names to generated SQL queries,
+        one per question and in the same order as `questions`
+    """
+    sqls = await generate_sql_requests_async(
+        [(question, prompt_func) for question in questions for _, prompt_func in prompts],
+        model_name, db_path, max_concurrency, batch_size, stream, samples
+    )
+    # Candidate dicts (self-consistency) are reduced to the voted SQL, executed off the event loop
+    for i, sql in enumerate(sqls):
+        if isinstance(sql, dict):
+            voted = await asyncio.to_thread(vote, sql["candidates"], db_path)
+            sqls[i] = voted["selected_sql"]
+    
+    # Regroup the flat list of completions into one mapping per question
+    results = []
+    for i in range(len(questions)):
+        question_sqls = sqls[i * len(prompts):(i + 1) * len(prompts)]
+        results.append({prompt_name: sql for (prompt_name, _), sql in zip(prompts, question_sqls)})
+    
+    return results
+
+
+async def generate_sql_async(question: str, prompts: list, model_name: str, db_path: str = "Chinook.db",
+                             max_concurrency: int = None, stream: bool = None, samples: int = None):
+    """
+    Async counterpart of `generate_sql`: sends all prompts for a question concurrently.
+    
+    Returns:
+        Dictionary mapping prompt names to generated SQL queries
+    """
+    results = await generate_sql_many_async([question], prompts, model_name, db_path, max_concurrency,
+                                            stream=stream, samples=samples)
+    return results[0]
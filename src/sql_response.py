@@ -1,22 +1,270 @@
-from utils import load_db, query_db
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from src.db_pool import get_pool, rows_as_dicts
+from src.sql_validation import validate_sql
 
+# Default per-query budgets; override per run with `set_query_budget`
+DEFAULT_TIME_LIMIT = 10.0
+DEFAULT_MAX_STEPS = 100_000_000
+DEFAULT_MAX_ROWS = 100_000
+DEFAULT_BATCH_SIZE = 1000
 
-def get_answer(sql_query: str, db_path: str = "Chinook.db"):
+# How many SQLite VM instructions run between progress handler calls
+PROGRESS_INTERVAL = 1000
+
+_budget = {"time_limit": DEFAULT_TIME_LIMIT, "max_steps": DEFAULT_MAX_STEPS, "max_rows": DEFAULT_MAX_ROWS}
+
+
+@dataclass
+class QueryBudgetExceeded:
+    """Result of a query that was aborted for exceeding its time or step budget."""
+    reason: str  # "timeout" or "step_limit"
+    elapsed: float
+    steps: int
+
+    def __str__(self):
+        return f"Error: query exceeded its {self.reason} budget after {self.elapsed:.2f}s and ~{self.steps} VM steps"
+
+
+def set_query_budget(time_limit: float = DEFAULT_TIME_LIMIT, max_steps: int = DEFAULT_MAX_STEPS,
+                     max_rows: int = DEFAULT_MAX_ROWS):
+    """
+    Set the default execution budget for `get_answer` and `AnswerStream`.
+    
+    Args:
+        time_limit: Wall-clock seconds per query (0 for no limit)
+        max_steps: SQLite VM instructions per query (0 for no limit)
+        max_rows: Rows read per streamed query (0 for no limit)
+    """
+    _budget["time_limit"] = time_limit
+    _budget["max_steps"] = max_steps
+    _budget["max_rows"] = max_rows
+
+
+def get_query_budget() -> dict:
+    """Return the current default execution budget (e.g. to hand to worker processes)."""
+    return dict(_budget)
+
+
+class _Watchdog:
+    """
+    One thread per process that interrupts connections whose query is past its deadline.
+
+    Wall-clock backstop for long single opcodes (e.g. big sorts) that don't
+    reach the progress handler. Deadlines wait in a heap; cancelled entries
+    are dropped lazily. Interrupts happen under the same lock as `cancel`, so
+    a connection is never interrupted after its query was cancelled.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        # Also run in forked children, which inherit neither the thread nor a usable lock state
+        self._cond = threading.Condition()
+        self._heap = []  # (deadline, watch id, connection)
+        self._active = set()
+        self._ids = itertools.count()
+        self._thread = None
+
+    def watch(self, conn, deadline: float) -> int:
+        """Interrupt `conn` at `deadline` (a `time.perf_counter()` value) unless cancelled first."""
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="query-watchdog", daemon=True)
+                self._thread.start()
+            watch_id = next(self._ids)
+            heapq.heappush(self._heap, (deadline, watch_id, conn))
+            self._active.add(watch_id)
+            self._cond.notify()
+            return watch_id
+
+    def cancel(self, watch_id: int):
+        with self._cond:
+            self._active.discard(watch_id)
+            if len(self._heap) > 2 * len(self._active) + 64:
+                self._heap = [entry for entry in self._heap if entry[1] in self._active]
+                heapq.heapify(self._heap)
+
+    def _run(self):
+        with self._cond:
+            while True:
+                while self._heap and self._heap[0][1] not in self._active:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                deadline, watch_id, conn = self._heap[0]
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                self._active.discard(watch_id)
+                conn.interrupt()
+
+
+_watchdog = _Watchdog()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_watchdog._reset)
+
+
+class _ExecutionBudget:
+    """Time and VM-step budget for one query, enforced via the progress handler and the watchdog's `interrupt`."""
+
+    def __init__(self, time_limit: float = None, max_steps: int = None):
+        self.time_limit = _budget["time_limit"] if time_limit is None else time_limit
+        self.max_steps = _budget["max_steps"] if max_steps is None else max_steps
+        self.start = time.perf_counter()
+        self.deadline = self.start + self.time_limit if self.time_limit else None
+        self.steps = 0
+        self.reason = None
+
+    def _progress(self):
+        self.steps += PROGRESS_INTERVAL
+        if self.max_steps and self.steps > self.max_steps:
+            self.reason = "step_limit"
+            return 1
+        if self.deadline and time.perf_counter() > self.deadline:
+            self.reason = "timeout"
+            return 1
+        return 0
+
+    @contextmanager
+    def applied(self, conn):
+        """Install the budget on a connection for the duration of the block."""
+        conn.set_progress_handler(self._progress, PROGRESS_INTERVAL)
+        # Long single opcodes (e.g. big sorts) don't reach the progress handler
+        watch_id = _watchdog.watch(conn, self.deadline) if self.deadline else None
+        try:
+            yield self
+        finally:
+            if watch_id is not None:
+                _watchdog.cancel(watch_id)
+            conn.set_progress_handler(None, 0)
+
+    def error_result(self, error: Exception):
+        """Map an execution error to QueryBudgetExceeded or the usual error string."""
+        if self.reason is None and "interrupted" in str(error) and self.deadline \
+                and time.perf_counter() >= self.deadline:
+            self.reason = "timeout"
+        if self.reason:
+            return QueryBudgetExceeded(self.reason, time.perf_counter() - self.start, self.steps)
+        return f"Error: {str(error)}"
+
+
+def get_answer(sql_query: str, db_path: str = "Chinook.db", time_limit: float = None, max_steps: int = None):
     """
     Execute SQL query and return results.
     
+    Uses a shared pool of read-only connections, so repeated calls skip
+    connection setup and schema parsing. The query is first validated with
+    `validate_sql`, so incomplete, invalid or non-read-only SQL is rejected
+    without being executed. Execution is aborted through SQLite's progress
+    handler (and the process's watchdog thread calling `interrupt` as a
+    wall-clock backstop) once the query exceeds its time or VM-instruction
+    budget.
+    
     Args:
         sql_query: SQL query string to execute
         db_path: Path to the SQLite database
+        time_limit: Wall-clock seconds allowed (defaults to the run's budget, 0 disables)
+        max_steps: VM instructions allowed (defaults to the run's budget, 0 disables)
         
     Returns:
-        List of dictionaries with results, or error string if failed
+        List of dictionaries with results, PreflightError if validation
+        rejected it, QueryBudgetExceeded if the query ran out of budget, or
+        error string if failed
     """
+    preflight_error = validate_sql(sql_query, db_path)
+    if preflight_error:
+        return preflight_error
+    budget = _ExecutionBudget(time_limit, max_steps)
     try:
-        conn = load_db(db_path)
-        results = query_db(conn, sql_query, return_as_df=False)
-        conn.close()
-        return results
+        with get_pool(db_path).connection() as conn, budget.applied(conn):
+            cursor = conn.execute(sql_query)
+            return rows_as_dicts(cursor, cursor.fetchall())
     except Exception as e:
-        return f"Error: {str(e)}"
+        return budget.error_result(e)
+
+
+class AnswerStream:
+    """
+    Streaming execution of a query: iterating yields rows in `fetchmany` batches.
+    
+    At most one batch is held in memory, and iteration stops after `max_rows`
+    rows. Errors don't raise; once iteration ends, `error` holds the
+    PreflightError, error string or QueryBudgetExceeded, just as `get_answer`
+    would have returned.
+    
+    Args:
+        sql_query: SQL query string to execute
+        db_path: Path to the SQLite database
+        batch_size: Rows fetched per batch
+        max_rows: Maximum rows read before the result is truncated (0 disables)
+        time_limit: Wall-clock seconds allowed (defaults to the run's budget, 0 disables)
+        max_steps: VM instructions allowed (defaults to the run's budget, 0 disables)
+    """
+
+    def __init__(self, sql_query: str, db_path: str = "Chinook.db", batch_size: int = None,
+                 max_rows: int = None, time_limit: float = None, max_steps: int = None):
+        self.sql_query = sql_query
+        self.db_path = db_path
+        self.batch_size = batch_size or DEFAULT_BATCH_SIZE
+        self.max_rows = _budget["max_rows"] if max_rows is None else max_rows
+        self.time_limit = time_limit
+        self.max_steps = max_steps
+        self.rows_read = 0
+        self.truncated = False
+        self.error = None
+        # Seconds spent validating, executing and fetching, excluding the consumer's time between batches
+        self.execution_time = 0.0
+
+    def __iter__(self):
+        batches = self._batches()
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    rows = next(batches, None)
+                finally:
+                    self.execution_time += time.perf_counter() - start
+                if rows is None:
+                    return
+                yield rows
+        finally:
+            batches.close()
 
+    def _batches(self):
+        self.error = validate_sql(self.sql_query, self.db_path)
+        if self.error:
+            return
+        budget = _ExecutionBudget(self.time_limit, self.max_steps)
+        try:
+            with get_pool(self.db_path).connection() as conn, budget.applied(conn):
+                cursor = conn.execute(self.sql_query)
+                try:
+                    while True:
+                        size = self.batch_size
+                        if self.max_rows:
+                            size = min(size, self.max_rows - self.rows_read)
+                            if size <= 0:
+                                self.truncated = cursor.fetchone() is not None
+                                break
+                        rows = cursor.fetchmany(size)
+                        if not rows:
+                            break
+                        self.rows_read += len(rows)
+                        yield rows_as_dicts(cursor, rows)
+                finally:
+                    # Finalize the statement before the connection goes back to the pool
+                    cursor.close()
+        except GeneratorExit:
+            raise
+        except Exception as e:
+            self.error = budget.error_result(e)
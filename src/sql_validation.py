@@ -0,0 +1,109 @@
+import re
+import sqlite3
+from dataclasses import dataclass
+from src.db_pool import get_pool
+
+# Authorizer actions a read-only query may perform; everything else (writes, DDL,
+# ATTACH/DETACH, PRAGMA, transactions) is denied
+_ALLOWED_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+# Names of the authorizer action codes, for error messages
+_ACTION_NAMES = {
+    getattr(sqlite3, f"SQLITE_{name}"): name
+    for name in (
+        "CREATE_INDEX", "CREATE_TABLE", "CREATE_TEMP_INDEX", "CREATE_TEMP_TABLE", "CREATE_TEMP_TRIGGER",
+        "CREATE_TEMP_VIEW", "CREATE_TRIGGER", "CREATE_VIEW", "DELETE", "DROP_INDEX", "DROP_TABLE",
+        "DROP_TEMP_INDEX", "DROP_TEMP_TABLE", "DROP_TEMP_TRIGGER", "DROP_TEMP_VIEW", "DROP_TRIGGER",
+        "DROP_VIEW", "INSERT", "PRAGMA", "TRANSACTION", "UPDATE", "ATTACH", "DETACH", "ALTER_TABLE",
+        "REINDEX", "ANALYZE", "CREATE_VTABLE", "DROP_VTABLE", "SAVEPOINT",
+    )
+}
+
+# Statements a query may start with; anything else (VACUUM, PRAGMA, writes, ...) is rejected up front
+_QUERY_KEYWORDS = {"SELECT", "WITH"}
+
+# First keyword of a statement, after leading whitespace and comments
+_LEADING_KEYWORD = re.compile(r"(?:\s+|--[^\n]*|/\*.*?\*/)*([A-Za-z]+)", re.DOTALL)
+
+# SQLite prepare errors -> category
+_ERROR_CATEGORIES = [
+    (re.compile(r"no such table"), "unknown_table"),
+    (re.compile(r"no such column|ambiguous column name"), "unknown_column"),
+    (re.compile(r"no such function|wrong number of arguments"), "unknown_function"),
+    (re.compile(r"not authorized|one statement at a time|may not be modified"), "forbidden"),
+]
+
+
+@dataclass
+class PreflightError:
+    """Generated SQL rejected before execution."""
+    category: str  # "empty", "incomplete", "syntax", "unknown_table", "unknown_column", "unknown_function" or "forbidden"
+    message: str
+
+    def __str__(self):
+        return f"Error ({self.category}): {self.message}"
+
+
+def _categorize(message: str) -> str:
+    for pattern, category in _ERROR_CATEGORIES:
+        if pattern.search(message):
+            return category
+    return "syntax"
+
+
+def validate_sql(sql_query: str, db_path: str = "Chinook.db"):
+    """
+    Check generated SQL without executing it.
+
+    Verifies the statement is complete (`sqlite3.complete_statement`) and is
+    a SELECT or WITH query, then compiles it with `EXPLAIN` on a pooled
+    read-only connection while an authorizer denies anything but reads
+    (including PRAGMA table-valued functions such as `pragma_table_info`).
+    EXPLAIN only lists the compiled program, so no table data is touched.
+
+    Args:
+        sql_query: SQL query string to validate
+        db_path: Path to the SQLite database
+
+    Returns:
+        None if the query may run, otherwise PreflightError
+    """
+    sql = (sql_query or "").strip()
+    if not sql.rstrip(";").strip():
+        return PreflightError("empty", "no SQL to execute")
+    # The terminator goes on its own line so a trailing `--` comment cannot swallow it
+    if not sqlite3.complete_statement(sql if sql.endswith(";") else sql + "\n;"):
+        return PreflightError("incomplete", "statement is incomplete (unterminated string, comment or block)")
+    keyword = _LEADING_KEYWORD.match(sql)
+    if keyword is None:
+        return PreflightError("forbidden", "statement does not start with a keyword; only SELECT and WITH queries may run")
+    if keyword.group(1).upper() not in _QUERY_KEYWORDS:
+        return PreflightError("forbidden", f"{keyword.group(1).upper()} statements are not allowed; "
+                                           f"only SELECT and WITH queries may run")
+
+    denied = []
+
+    def _authorize(action, arg1, arg2, db_name, trigger):
+        if action == sqlite3.SQLITE_READ and arg1.startswith("pragma_"):
+            denied.append(f"PRAGMA {arg1[len('pragma_'):]}")
+            return sqlite3.SQLITE_DENY
+        if action in _ALLOWED_ACTIONS:
+            return sqlite3.SQLITE_OK
+        if action == sqlite3.SQLITE_UPDATE and arg1 == "sqlite_master":
+            # SQLite registers table-valued functions (json_each, pragma_*) through an internal
+            # schema update; the connection is read-only, so let it through and judge the reads
+            return sqlite3.SQLITE_IGNORE
+        denied.append(" ".join(str(part) for part in (_ACTION_NAMES.get(action, action), arg1) if part))
+        return sqlite3.SQLITE_DENY
+
+    with get_pool(db_path).connection() as conn:
+        conn.set_authorizer(_authorize)
+        try:
+            conn.execute(f"EXPLAIN {sql}").close()
+        except (sqlite3.Error, sqlite3.Warning) as e:
+            if denied:
+                return PreflightError("forbidden", f"{denied[0]} is not allowed")
+            return PreflightError(_categorize(str(e)), str(e))
+        finally:
+            conn.set_authorizer(None)
+    return None
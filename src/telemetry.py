@@ -0,0 +1,183 @@
+import math
+import random
+from pathlib import Path
+
+# Stages timed for every (model, prompt, case), in pipeline order
+STAGES = ["prompt_build", "queue_wait", "ttft", "generation", "extraction", "execution", "scoring"]
+
+QUANTILES = [0.5, 0.95, 0.99]
+
+# Record fields the percentiles are aggregated over
+DIMENSIONS = ["model", "prompt"]
+
+# Stages a response-cache hit skips; its zero latencies would skew their percentiles
+GENERATION_STAGES = ["ttft", "generation"]
+
+# Observations kept per metric for percentiles; count, sum, min and max stay exact
+RESERVOIR_SIZE = 10_000
+
+TELEMETRY_HEADER = ["Dimension", "Name", "Metric", "Count", "Mean", "Min", "p50", "p95", "p99", "Max"]
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Percentile `q` (0-1) of sorted values, linearly interpolated between ranks."""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * q
+    low = math.floor(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+class Reservoir:
+    """
+    Exact count, sum, min and max of a stream of values, plus a uniform sample
+    of at most `size` of them (reservoir sampling) to estimate percentiles.
+
+    Percentiles are exact while no more than `size` values have been added.
+    """
+
+    def __init__(self, size: int = RESERVOIR_SIZE, seed: int = 0):
+        self.size = size
+        self.sample = []
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self._random = random.Random(seed)
+
+    def add(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if len(self.sample) < self.size:
+            self.sample.append(value)
+        else:
+            slot = self._random.randrange(self.count)
+            if slot < self.size:
+                self.sample[slot] = value
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+class Telemetry:
+    """
+    Per-stage latency and throughput of a run, aggregated per model and per prompt.
+
+    Records are the journal-style dicts written for each (model, prompt, case):
+    'timings' maps stage names (see `STAGES`) to seconds, plus optional
+    'prompt_tokens', 'completion_tokens' and 'tokens_per_second'. Missing or
+    None values (e.g. no time-to-first-token without streaming) are skipped,
+    as are the generation stages of responses served from the response cache
+    ('cached'), which are counted separately.
+    """
+
+    def __init__(self):
+        # (dimension, name, metric) -> Reservoir of observed values
+        self.values = {}
+        # (dimension, name) -> [prompt_tokens, completion_tokens]
+        self.tokens = {}
+        # (dimension, name) -> responses served from the response cache
+        self.cached = {}
+
+    def add(self, record: dict):
+        """Fold one result's telemetry into the aggregates."""
+        metrics = dict(record.get("timings") or {})
+        metrics["tokens_per_second"] = record.get("tokens_per_second")
+        if record.get("cached"):
+            for stage in GENERATION_STAGES:
+                metrics.pop(stage, None)
+        for dimension in DIMENSIONS:
+            name = record[dimension]
+            for metric, value in metrics.items():
+                if value is not None:
+                    self.values.setdefault((dimension, name, metric), Reservoir()).add(value)
+            if record.get("cached"):
+                self.cached[(dimension, name)] = self.cached.get((dimension, name), 0) + 1
+            if record.get("prompt_tokens") is not None:
+                tokens = self.tokens.setdefault((dimension, name), [0, 0])
+                tokens[0] += record["prompt_tokens"]
+                tokens[1] += record.get("completion_tokens") or 0
+
+    def summary(self) -> list:
+        """
+        Aggregate the observed values.
+
+        Returns:
+            List of dicts with dimension, name, metric, count, sum, mean, min, max
+            and one entry per quantile ('p50', 'p95', 'p99'; estimated from the
+            reservoir sample), ordered by dimension, name and stage
+        """
+        order = {metric: i for i, metric in enumerate(STAGES + ["tokens_per_second"])}
+        rows = []
+        for (dimension, name, metric), reservoir in sorted(
+                self.values.items(), key=lambda item: (item[0][0], str(item[0][1]), order.get(item[0][2], len(order)))):
+            values = sorted(reservoir.sample)
+            row = {
+                "dimension": dimension, "name": name, "metric": metric, "count": reservoir.count,
+                "sum": reservoir.sum, "mean": reservoir.sum / reservoir.count, "min": reservoir.min, "max": reservoir.max,
+            }
+            for q in QUANTILES:
+                row[f"p{round(q * 100)}"] = percentile(values, q)
+            rows.append(row)
+        return rows
+
+    def table(self) -> list:
+        """Summary as spreadsheet rows under `TELEMETRY_HEADER`."""
+        return [
+            [row["dimension"], row["name"], row["metric"], row["count"], row["mean"], row["min"],
+             row["p50"], row["p95"], row["p99"], row["max"]]
+            for row in self.summary()
+        ]
+
+    def prometheus_text(self) -> str:
+        """
+        Render the aggregates in the Prometheus text exposition format.
+
+        Stage latencies and tokens/sec are summaries with p50/p95/p99 quantiles,
+        labelled by either `model` or `prompt`; token counts and response-cache
+        hits are counters.
+        """
+        summaries = {
+            "text_to_sql_stage_seconds": ("Per-stage latency of (model, prompt, case) evaluations.", []),
+            "text_to_sql_tokens_per_second": ("Completion tokens per second of generation.", []),
+        }
+        for row in self.summary():
+            if row["metric"] == "tokens_per_second":
+                name, labels = "text_to_sql_tokens_per_second", {row["dimension"]: row["name"]}
+            else:
+                name, labels = "text_to_sql_stage_seconds", {row["dimension"]: row["name"], "stage": row["metric"]}
+            samples = summaries[name][1]
+            for q in QUANTILES:
+                samples.append(f"{name}{_labels(**labels, quantile=q)} {row[f'p{round(q * 100)}']!r}")
+            samples.append(f"{name}_sum{_labels(**labels)} {row['sum']!r}")
+            samples.append(f"{name}_count{_labels(**labels)} {row['count']}")
+
+        lines = []
+        for name, (help_text, samples) in summaries.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} summary"] + samples
+        lines += ["# HELP text_to_sql_tokens_total Tokens used, by kind (prompt or completion).",
+                  "# TYPE text_to_sql_tokens_total counter"]
+        for (dimension, name), (prompt_tokens, completion_tokens) in sorted(
+                self.tokens.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            lines.append(f"text_to_sql_tokens_total{_labels(**{dimension: name}, kind='prompt')} {prompt_tokens}")
+            lines.append(f"text_to_sql_tokens_total{_labels(**{dimension: name}, kind='completion')} {completion_tokens}")
+        lines += ["# HELP text_to_sql_cached_responses_total Responses served from the response cache.",
+                  "# TYPE text_to_sql_cached_responses_total counter"]
+        for (dimension, name), count in sorted(self.cached.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            lines.append(f"text_to_sql_cached_responses_total{_labels(**{dimension: name})} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> Path:
+        """Write `prometheus_text` to `path` (e.g. for node_exporter's textfile collector)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.prometheus_text())
+        return path
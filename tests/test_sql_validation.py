@@ -0,0 +1,35 @@
+from src.sql_validation import validate_sql
+
+
+def test_accepts_trailing_line_comment():
+    assert validate_sql("SELECT Name FROM Artist -- all artists") is None
+    assert validate_sql("SELECT Name FROM Artist; -- all artists") is None
+
+
+def test_rejects_unterminated_block_comment():
+    error = validate_sql("SELECT Name FROM Artist /* all artists")
+    assert error is not None and error.category == "incomplete"
+
+
+def test_rejects_writes():
+    error = validate_sql("DELETE FROM Artist")
+    assert error is not None and error.category == "forbidden"
+
+
+def test_rejects_non_query_statements_by_keyword():
+    for sql, keyword in [("VACUUM", "VACUUM"), ("PRAGMA table_info(Artist)", "PRAGMA"),
+                         ("-- tidy up\nvacuum;", "VACUUM")]:
+        error = validate_sql(sql)
+        assert error is not None and error.category == "forbidden"
+        assert error.message.startswith(keyword)
+
+
+def test_rejects_pragma_table_valued_functions():
+    error = validate_sql("SELECT name FROM pragma_table_info('Artist')")
+    assert error is not None and error.category == "forbidden"
+    assert error.message == "PRAGMA table_info is not allowed"
+
+
+def test_accepts_with_queries_and_table_valued_functions():
+    assert validate_sql("WITH names AS (SELECT Name FROM Artist) SELECT * FROM names") is None
+    assert validate_sql("SELECT value FROM json_each('[1, 2]')") is None